@@ -0,0 +1,5 @@
+import os
+import sys
+
+# src 下的模块互相以顶层模块名导入（from model import ...）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
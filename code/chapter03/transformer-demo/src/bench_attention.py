@@ -0,0 +1,62 @@
+# src/bench_attention.py
+# 在 CPU 上比较手写注意力与融合 scaled_dot_product_attention 的单步耗时和峰值内存
+# 用法: python bench_attention.py [--block-sizes 128 256 512 1024 2048]
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import torch
+from model import TransformerLM
+
+
+def run_worker(backend: str, block_size: int, batch_size: int, steps: int):
+    """在独立进程中运行，避免不同配置之间的内存峰值相互影响"""
+    torch.manual_seed(0)
+    model = TransformerLM(vocab_size=1000, block_size=block_size, dropout=0.0, attn_backend=backend)
+    x = torch.randint(0, 1000, (batch_size, block_size))
+    y = torch.randint(0, 1000, (batch_size, block_size))
+
+    def step():
+        logits = model(x)
+        loss = torch.nn.functional.cross_entropy(logits.view(-1, 1000), y.view(-1))
+        loss.backward()
+        model.zero_grad(set_to_none=True)
+
+    step()  # warmup
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    elapsed = (time.perf_counter() - start) / steps
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss 在 Linux 上单位为 KB
+    print(json.dumps({"step_ms": elapsed * 1000, "peak_mb": peak_rss / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--block-sizes", type=int, nargs="+", default=[128, 256, 512, 1024, 2048])
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--worker", nargs=2, metavar=("BACKEND", "BLOCK_SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker[0], int(args.worker[1]), args.batch_size, args.steps)
+        return
+
+    print(f"{'block':>6} {'backend':>7} {'step(ms)':>10} {'peak RSS(MB)':>13}")
+    for block_size in args.block_sizes:
+        for backend in ("manual", "sdpa"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker", backend, str(block_size),
+                 "--batch-size", str(args.batch_size), "--steps", str(args.steps)],
+                capture_output=True, text=True, check=True,
+            )
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{block_size:>6} {backend:>7} {r['step_ms']:>10.1f} {r['peak_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
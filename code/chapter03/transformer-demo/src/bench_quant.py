@@ -0,0 +1,73 @@
+# src/bench_quant.py
+# 在 CPU 上比较 fp32 与动态 int8 量化模型的生成速度（tokens/sec）、模型大小和困惑度
+# 用法: python bench_quant.py [--ckpt checkpoints/ckpt-0002000.pt] [--text ../data/tiny.txt]
+import argparse
+import io
+import math
+import time
+import torch
+import torch.nn.functional as F
+from config import Config
+from checkpoint import latest_checkpoint
+from tokenizer import load_tokenizer
+from quantize import load_model
+
+def state_dict_mb(model):
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell() / 2**20
+
+@torch.no_grad()
+def perplexity(model, ids, block_size):
+    """按 block_size 切成不重叠的窗口，计算整段文本的平均交叉熵"""
+    ids = torch.tensor(ids, dtype=torch.long)
+    total, count = 0.0, 0
+    for s in range(0, len(ids) - 1, block_size):
+        x = ids[s:s + block_size].unsqueeze(0)
+        y = ids[s + 1:s + 1 + block_size].unsqueeze(0)
+        x = x[:, :y.size(1)]
+        logits = model(x)
+        total += F.cross_entropy(logits.view(-1, logits.size(-1)), y.view(-1), reduction="sum").item()
+        count += y.numel()
+    return math.exp(total / count)
+
+def tokens_per_sec(model, prompt, max_new_tokens, batch_size, runs):
+    best = float("inf")
+    for _ in range(runs):
+        torch.manual_seed(0)
+        start = time.perf_counter()
+        model.generate_batch([prompt] * batch_size, max_new_tokens=max_new_tokens)
+        best = min(best, time.perf_counter() - start)
+    return batch_size * max_new_tokens / best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt", default=None, help="fp32 检查点，默认使用 ckpt_dir 中最新的检查点")
+    parser.add_argument("--text", default="../data/tiny.txt", help="计算困惑度的评估文本")
+    parser.add_argument("--max-new-tokens", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    cfg = Config()
+    ckpt_path = args.ckpt or latest_checkpoint(cfg.ckpt_dir)
+    if ckpt_path is None:
+        raise FileNotFoundError(f"{cfg.ckpt_dir} 中没有检查点，请先运行 train.py")
+    ckpt = torch.load(ckpt_path, map_location="cpu")
+    tok = load_tokenizer(ckpt.get("tokenizer", "char"), ckpt["tok"])
+    with open(args.text, encoding="utf-8") as f:
+        ids = tok.encode(f.read())
+    prompt = ids[:16]
+
+    models = [("fp32", load_model(ckpt, cfg, "cpu")), ("int8", load_model(ckpt, cfg, quantize=True))]
+    print(f"{'model':>6} {'size(MB)':>9} {'tokens/s':>9} {'ppl':>9}")
+    base_ppl = None
+    for name, model in models:
+        ppl = perplexity(model, ids, cfg.block_size)
+        tps = tokens_per_sec(model, prompt, args.max_new_tokens, args.batch_size, args.runs)
+        drift = "" if base_ppl is None else f"  ({(ppl / base_ppl - 1) * 100:+.2f}% vs fp32)"
+        base_ppl = base_ppl or ppl
+        print(f"{name:>6} {state_dict_mb(model):>9.2f} {tps:>9.1f} {ppl:>9.3f}{drift}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# src/bench_speculative.py
+# 在 CPU 上比较主模型逐 token 生成与投机解码：每次验证接受的 token 数和端到端 tokens/sec
+# 用法: python bench_speculative.py [--ckpt ...] [--draft-ckpt ...] [--k 2 4 6] [--max-new-tokens 200]
+import argparse
+import time
+import torch
+from config import Config
+from checkpoint import latest_checkpoint
+from tokenizer import load_tokenizer
+from quantize import load_model
+
+def load(path, cfg, hint):
+    path = path or latest_checkpoint(cfg.ckpt_dir)
+    if path is None:
+        raise FileNotFoundError(f"{cfg.ckpt_dir} 中没有检查点，请先运行 {hint}")
+    ckpt = torch.load(path, map_location="cpu")
+    return ckpt, load_model(ckpt, cfg, "cpu")
+
+def best_of(runs, fn):
+    best, result = float("inf"), None
+    for _ in range(runs):
+        torch.manual_seed(0)
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt", default=None, help="主模型检查点，默认使用 ckpt_dir 中最新的检查点")
+    parser.add_argument("--draft-ckpt", default=None, help="草稿模型检查点，默认使用 draft_ckpt_dir 中最新的检查点")
+    parser.add_argument("--prompt", default="LLM是")
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 4, 6])
+    parser.add_argument("--max-new-tokens", type=int, default=200)
+    parser.add_argument("--temperature", type=float, default=1.0)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    cfg = Config()
+    ckpt, model = load(args.ckpt, cfg, "train.py")
+    _, draft = load(args.draft_ckpt, cfg.draft(), "train.py --draft")
+    tok = load_tokenizer(ckpt.get("tokenizer", "char"), ckpt["tok"])
+    idx = torch.tensor([tok.encode(args.prompt) or [0]], dtype=torch.long)
+    n = args.max_new_tokens
+
+    base, _ = best_of(args.runs, lambda: model.generate_batch(idx.tolist(), max_new_tokens=n,
+                                                               temperature=args.temperature))
+    print(f"{'mode':>10} {'tokens/s':>9} {'accepted/step':>14} {'tokens/step':>12} {'speedup':>8}")
+    print(f"{'baseline':>10} {n / base:>9.1f} {'-':>14} {1.0:>12.2f} {1.0:>8.2f}")
+    for k in args.k:
+        elapsed, (_, stats) = best_of(args.runs, lambda: model.generate_speculative(
+            idx, draft, n, k=k, temperature=args.temperature))
+        steps = stats["verify_steps"]
+        print(f"{f'k={k}':>10} {n / elapsed:>9.1f} {stats['accepted'] / steps:>14.2f} "
+              f"{n / steps:>12.2f} {base / elapsed:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# src/bench_tokenizer.py
+# 比较逐字符的字典查表实现与向量化 CharTokenizer 的编码/解码速度（chars/sec）
+# 用法: python bench_tokenizer.py [--text data/tiny.txt] [--repeat 200]
+import argparse
+import time
+from tokenizer import CharTokenizer
+
+def encode_loop(tok, s):
+    return [tok.stoi[ch] for ch in s if ch in tok.stoi]
+
+def decode_loop(tok, ids):
+    return "".join(tok.itos[i] for i in ids if i in tok.itos)
+
+def timeit(fn, *args, runs=3):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--text", default="../data/tiny.txt")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.text, encoding="utf-8") as f:
+        base = f.read()
+    # 去掉一部分字符构建词表，使编码时包含未知字符
+    tok = CharTokenizer(base[: len(base) // 2])
+    text = base * args.repeat
+    ids = tok.encode(text)
+    assert ids == encode_loop(tok, text)
+    assert tok.decode(ids) == decode_loop(tok, ids)
+
+    n = len(text)
+    rows = [
+        ("encode (loop)", timeit(encode_loop, tok, text)),
+        ("encode (vectorized)", timeit(tok.encode, text)),
+        ("encode_array", timeit(tok.encode_array, text)),
+        ("decode (loop)", timeit(decode_loop, tok, ids)),
+        ("decode (vectorized)", timeit(tok.decode, ids)),
+    ]
+    lines = text.splitlines()
+    rows.append(("encode_batch", timeit(tok.encode_batch, lines)))
+    print(f"{n} chars, vocab {tok.vocab_size}")
+    for name, seconds in rows:
+        print(f"{name:<22} {n / seconds / 1e6:>8.2f} M chars/sec")
+
+if __name__ == "__main__":
+    main()
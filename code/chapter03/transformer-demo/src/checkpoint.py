@@ -0,0 +1,95 @@
+# src/checkpoint.py
+# 可恢复训练的检查点：后台线程原子写盘，只保留最近 K 个；以及随机数状态的保存与恢复
+import glob
+import os
+import random
+import re
+import threading
+import numpy as np
+import torch
+
+_CKPT_RE = re.compile(r"ckpt-(\d+)\.pt$")
+
+def cpu_snapshot(obj):
+    """递归复制到 CPU：张量 clone 一份，之后训练继续更新参数也不会影响快照"""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: cpu_snapshot(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(cpu_snapshot(v) for v in obj)
+    return obj
+
+def list_checkpoints(ckpt_dir: str):
+    """按步数从小到大返回目录中的检查点路径"""
+    paths = [p for p in glob.glob(os.path.join(ckpt_dir, "ckpt-*.pt")) if _CKPT_RE.search(p)]
+    return sorted(paths, key=lambda p: int(_CKPT_RE.search(p).group(1)))
+
+def latest_checkpoint(ckpt_dir: str):
+    """最新的检查点路径，没有时返回 None"""
+    paths = list_checkpoints(ckpt_dir)
+    return paths[-1] if paths else None
+
+def atomic_save(obj, path: str):
+    """先写临时文件并 fsync，再用 os.replace 重命名：中途崩溃不会留下写了一半的检查点"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        torch.save(obj, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def capture_rng_state():
+    """torch / CUDA / numpy / random 的随机数状态（只含张量与基本类型，可用 weights_only 加载）"""
+    np_state = np.random.get_state(legacy=False)
+    return {
+        "torch": torch.get_rng_state(),
+        "cuda": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else [],
+        "numpy": {**np_state, "state": {"key": np_state["state"]["key"].tolist(), "pos": np_state["state"]["pos"]}},
+        "python": random.getstate(),
+    }
+
+def restore_rng_state(state):
+    torch.set_rng_state(state["torch"])
+    if state["cuda"] and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+    np_state = state["numpy"]
+    np.random.set_state({**np_state, "state": {"key": np.array(np_state["state"]["key"], dtype=np.uint32),
+                                               "pos": np_state["state"]["pos"]}})
+    random.setstate(state["python"])
+
+class AsyncCheckpointer:
+    """
+    主线程只做一次 CPU 快照，序列化和写盘在后台线程完成，不阻塞训练。
+    检查点写到 ckpt_dir/ckpt-<step>.pt，写成功后删除多余的旧检查点，只保留最近 keep_last 个。
+    """
+    def __init__(self, ckpt_dir: str, keep_last: int = 3):
+        self.ckpt_dir = ckpt_dir
+        self.keep_last = max(1, keep_last)
+        self._thread = None
+        self._error = None
+        os.makedirs(ckpt_dir, exist_ok=True)
+
+    def save(self, state, step: int):
+        # 同一时间只有一个写盘任务，上一次还没写完时先等待
+        self.wait()
+        snapshot = cpu_snapshot(state)
+        path = os.path.join(self.ckpt_dir, f"ckpt-{step:07d}.pt")
+        self._thread = threading.Thread(target=self._write, args=(snapshot, path), name="checkpoint")
+        self._thread.start()
+
+    def _write(self, snapshot, path: str):
+        try:
+            atomic_save(snapshot, path)
+            for old in list_checkpoints(self.ckpt_dir)[:-self.keep_last]:
+                os.remove(old)
+        except Exception as e:  # 在主线程的下一次 wait 中抛出
+            self._error = e
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
@@ -1,5 +1,5 @@
 # src/config.py
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
 @dataclass
 class Config:
@@ -14,3 +14,30 @@ class Config:
     max_steps: int = 2000
     lr: float = 3e-4
     device: str = "cuda"  # 自动切换：在 train.py 检测
+    attn_backend: str = "auto"  # auto / sdpa / manual
+    data_path: str = "data/LLMBook.pdf"  # 原始语料
+    cache_dir: str = "data/cache"  # 抽取的文本与 token 文件缓存目录（按 PDF 哈希与修改时间区分）
+    extract_workers: int = 0  # 并行抽取 PDF 的进程数，0 表示使用全部 CPU
+    num_workers: int = 0  # DataLoader worker 数
+    tokenizer: str = "char"  # char：字符级；bpe：字节级 BPE（序列更短）
+    bpe_vocab_size: int = 4096  # tokenizer="bpe" 时的目标词表大小
+    grad_accum_steps: int = 1  # 梯度累积：每个优化步累积的 micro-batch 数
+    compile: bool = False  # 是否用 torch.compile 编译模型
+    bf16_cpu: bool = False  # CPU 上启用 bfloat16 autocast
+    log_interval: int = 20  # 每隔多少步同步一次 loss 并打印吞吐
+    ckpt_interval: int = 200  # 每隔多少步保存检查点（后台线程写盘）
+    ckpt_dir: str = "checkpoints"  # 检查点目录，文件名为 ckpt-<step>.pt
+    keep_last: int = 3  # 只保留最近的 K 个检查点
+    seed: int = 42  # 模型初始化与数据顺序的随机种子
+    # 投机解码的草稿模型：与主模型共享分词器和训练数据，层数和宽度更小
+    draft_n_layers: int = 1
+    draft_d_model: int = 128
+    draft_n_heads: int = 4
+    draft_d_ff: int = 512
+    draft_ckpt_dir: str = "checkpoints/draft"
+    spec_k: int = 4  # 每次验证前草稿模型提出的候选 token 数
+
+    def draft(self) -> "Config":
+        """草稿模型的配置：替换模型尺寸和检查点目录，其余设置不变"""
+        return replace(self, n_layers=self.draft_n_layers, d_model=self.draft_d_model,
+                       n_heads=self.draft_n_heads, d_ff=self.draft_d_ff, ckpt_dir=self.draft_ckpt_dir)
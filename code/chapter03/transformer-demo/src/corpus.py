@@ -0,0 +1,52 @@
+# src/corpus.py
+# 训练语料构建：并行抽取 PDF 文本，按文件哈希和修改时间缓存到磁盘
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+def file_fingerprint(path: str, chunk_size: int = 1 << 20) -> str:
+    """文件内容的 sha256 前 16 位 + 修改时间，作为缓存键"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return f"{h.hexdigest()[:16]}-{int(os.path.getmtime(path))}"
+
+def _extract_range(args):
+    """子进程中运行：各自打开 PDF，抽取 [start, end) 页的文本"""
+    import pdfplumber
+    pdf_path, start, end = args
+    with pdfplumber.open(pdf_path) as pdf:
+        return "".join(pdf.pages[i].extract_text() or "" for i in range(start, end))
+
+def _page_count(pdf_path: str) -> int:
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def extract_pdf_text(pdf_path: str, out_path: str, workers: int = 0, pages_per_task: int = 8):
+    """
+    用进程池并行抽取 PDF 每页文本，按页序流式写入 out_path（不在内存中拼接整本书）。
+    workers <= 0 时使用全部 CPU。
+    """
+    n_pages = _page_count(pdf_path)
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    tasks = [(pdf_path, s, min(s + pages_per_task, n_pages)) for s in range(0, n_pages, pages_per_task)]
+    tmp = out_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        # map 按提交顺序返回结果，保证页序
+        for text in pool.map(_extract_range, tasks):
+            f.write(text)
+    os.replace(tmp, out_path)
+
+def build_corpus(pdf_path: str, cache_dir: str, workers: int = 0) -> str:
+    """
+    返回 PDF 对应的纯文本语料路径；缓存命中（同一文件哈希与修改时间）时直接返回，不再解析 PDF。
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    out_path = os.path.join(cache_dir, f"{stem}-{file_fingerprint(pdf_path)}.txt")
+    if not os.path.exists(out_path):
+        print(f"extracting {pdf_path} -> {out_path}")
+        extract_pdf_text(pdf_path, out_path, workers)
+    return out_path
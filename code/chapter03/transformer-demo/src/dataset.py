@@ -0,0 +1,104 @@
+# src/dataset.py
+# 训练数据集：内存中的 token 序列，或写入磁盘后通过 np.memmap 读取的 token 文件
+import json
+import os
+import numpy as np
+import torch
+from torch.utils.data import Dataset, Sampler
+
+def token_dtype(vocab_size: int):
+    """词表不超过 65536 时用 uint16（每个 token 2 字节），否则用 uint32"""
+    return np.uint16 if vocab_size <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+def write_token_file(ids, path: str, vocab_size: int, chunk_size: int = 1 << 20, meta=None):
+    """
+    预处理：把 token id 写成紧凑的二进制文件，并在 path + ".json" 中记录 dtype、长度以及 meta 中的额外信息。
+    ids 可以是列表、数组或按块产出 id 的可迭代对象，分块写入，避免一次性在内存中构造大数组。
+    先写临时文件再重命名，中途中断不会留下损坏的 token 文件。
+    """
+    dtype = token_dtype(vocab_size)
+    tmp = path + ".tmp"
+    length = 0
+    with open(tmp, "wb") as f:
+        chunks = ids
+        if isinstance(ids, (list, np.ndarray)):
+            chunks = (ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size))
+        for chunk in chunks:
+            arr = np.asarray(chunk, dtype=dtype)
+            arr.tofile(f)
+            length += arr.size
+    os.replace(tmp, path)
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump({**(meta or {}), "dtype": np.dtype(dtype).name, "length": length, "vocab_size": vocab_size},
+                  f, ensure_ascii=False)
+    return length
+
+def read_token_meta(path: str):
+    """读取 token 文件的元信息，文件不存在时返回 None"""
+    if not (os.path.exists(path) and os.path.exists(path + ".json")):
+        return None
+    with open(path + ".json", encoding="utf-8") as f:
+        return json.load(f)
+
+class TextDataset(Dataset):
+    """内存中的 token 序列：整体转换为一个张量，样本是它的切片视图，不再逐样本复制"""
+    def __init__(self, ids, block_size):
+        self.ids = torch.as_tensor(ids, dtype=torch.long)
+        self.block_size = block_size
+    def __len__(self): return len(self.ids) - self.block_size
+    def __getitem__(self, i):
+        x = self.ids[i:i+self.block_size]
+        y = self.ids[i+1:i+1+self.block_size]
+        return x, y
+
+class MemmapTextDataset(Dataset):
+    """
+    基于 np.memmap 的 token 数据集：数据留在磁盘上由操作系统按页缓存，
+    训练进程的常驻内存不随语料大小增长；DataLoader 的多个 worker 共享同一份页缓存，
+    数据集对象只携带文件路径，不会把整份语料 pickle 给每个 worker。
+    返回的 x, y 是 uint16/uint32 的 torch.from_numpy 视图，送入模型前需转换为 long。
+    """
+    def __init__(self, path: str, block_size: int):
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.path = path
+        self.dtype = np.dtype(meta["dtype"])
+        self.length = meta["length"]
+        self.block_size = block_size
+        self._data = None  # 延迟打开，每个 worker 进程各自 mmap
+
+    @property
+    def data(self):
+        if self._data is None:
+            # mode="c"：写时复制，数组可写（torch.from_numpy 不会告警），但不会修改磁盘文件
+            self._data = np.memmap(self.path, dtype=self.dtype, mode="c", shape=(self.length,))
+        return self._data
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+    def __len__(self): return self.length - self.block_size
+    def __getitem__(self, i):
+        chunk = torch.from_numpy(self.data[i:i+self.block_size+1])
+        return chunk[:-1], chunk[1:]
+
+class ResumableRandomSampler(Sampler):
+    """
+    可断点续训的随机采样器：第 epoch 轮的顺序由 seed + epoch 唯一确定，
+    set_state 可以从某一轮的第 start 个样本继续，恢复训练时不必重放已经训练过的 batch。
+    """
+    def __init__(self, num_samples: int, seed: int = 0):
+        self.num_samples = num_samples
+        self.seed = seed
+        self.epoch = 0
+        self.start = 0
+
+    def set_state(self, epoch: int, start: int = 0):
+        self.epoch, self.start = epoch, start
+
+    def __len__(self): return max(0, self.num_samples - self.start)
+    def __iter__(self):
+        g = torch.Generator().manual_seed(self.seed + self.epoch)
+        return iter(torch.randperm(self.num_samples, generator=g)[self.start:].tolist())
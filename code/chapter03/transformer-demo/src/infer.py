@@ -1,39 +1,65 @@
 # src/infer.py
+import argparse
 import torch
-from model import TransformerLM
-from tokenizer import CharTokenizer
+from tokenizer import load_tokenizer
 from config import Config
+from checkpoint import latest_checkpoint
+from quantize import load_model
 
-def load_tokenizer(stoi):
-    tok = CharTokenizer("")  # dummy
-    tok.stoi = stoi
-    tok.itos = {i: ch for ch, i in stoi.items()}
-    tok.vocab_size = len(stoi)
-    return tok
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prompt", action="append", help="可重复传入多个 prompt，批量生成")
+    parser.add_argument("--max-new-tokens", type=int, default=200)
+    parser.add_argument("--temperature", type=float, default=1.0)
+    parser.add_argument("--top-k", type=int, default=None)
+    parser.add_argument("--top-p", type=float, default=None)
+    parser.add_argument("--ckpt", default=None, help="检查点路径（fp32 或 quantize.py 导出的 int8），默认使用 ckpt_dir 中最新的检查点")
+    parser.add_argument("--quantize", action="store_true", help="加载 fp32 检查点后做动态 int8 量化，在 CPU 上推理")
+    parser.add_argument("--speculative", action="store_true", help="使用草稿模型做投机解码（逐个 prompt 生成）")
+    parser.add_argument("--draft-ckpt", default=None, help="草稿模型检查点，默认使用 draft_ckpt_dir 中最新的检查点")
+    parser.add_argument("--spec-k", type=int, default=None, help="每次验证的候选 token 数，默认 Config.spec_k")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     cfg = Config()
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    ckpt = torch.load("ckpt.pt", map_location=device)
-    stoi = ckpt["tok"]
-    tok = load_tokenizer(stoi)
+    ckpt_path = args.ckpt or latest_checkpoint(cfg.ckpt_dir)
+    if ckpt_path is None:
+        raise FileNotFoundError(f"{cfg.ckpt_dir} 中没有检查点，请先运行 train.py")
+    ckpt = torch.load(ckpt_path, map_location="cpu")
+    tok = load_tokenizer(ckpt.get("tokenizer", "char"), ckpt["tok"])
 
-    model = TransformerLM(
-        vocab_size=tok.vocab_size,
-        d_model=cfg.d_model,
-        n_heads=cfg.n_heads,
-        d_ff=cfg.d_ff,
-        n_layers=cfg.n_layers,
-        block_size=cfg.block_size,
-        dropout=cfg.dropout,
-    ).to(device)
-    model.load_state_dict(ckpt["model"])
-    model.eval()
+    model = load_model(ckpt, cfg, device, quantize=args.quantize)
 
-    prompt = "LLM是"
-    idx = torch.tensor([tok.encode(prompt)], dtype=torch.long).to(device)
-    out = model.generate(idx, max_new_tokens=200)
-    print(tok.decode(out[0].tolist()))
+    prompts = args.prompt or ["LLM是"]
+    if args.speculative:
+        draft_cfg = cfg.draft()
+        draft_path = args.draft_ckpt or latest_checkpoint(draft_cfg.ckpt_dir)
+        if draft_path is None:
+            raise FileNotFoundError(f"{draft_cfg.ckpt_dir} 中没有草稿模型检查点，请先运行 train.py --draft")
+        draft = load_model(torch.load(draft_path, map_location="cpu"), draft_cfg, device, quantize=args.quantize)
+        model_device = model.device
+        for p in prompts:
+            idx = torch.tensor([tok.encode(p)], dtype=torch.long, device=model_device)
+            out, stats = model.generate_speculative(
+                idx, draft, args.max_new_tokens, k=args.spec_k or cfg.spec_k,
+                temperature=args.temperature, top_k=args.top_k, top_p=args.top_p,
+            )
+            print(tok.decode(out[0].tolist()))
+            print(f"verify steps: {stats['verify_steps']}, accepted {stats['accepted']}/{stats['drafted']} drafted")
+            print("-" * 40)
+        return
+    outs = model.generate_batch(
+        [tok.encode(p) for p in prompts],
+        max_new_tokens=args.max_new_tokens,
+        temperature=args.temperature,
+        top_k=args.top_k,
+        top_p=args.top_p,
+    )
+    for out in outs:
+        print(tok.decode(out))
+        print("-" * 40)
 
 if __name__ == "__main__":
     main()
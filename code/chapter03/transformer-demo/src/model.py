@@ -15,22 +15,123 @@ class PositionalEncoding(nn.Module):
         pe[:, 1::2] = torch.cos(position * div_term)
         self.register_buffer("pe", pe)
 
-    def forward(self, x):
-        # x: (batch, seq, d_model)
+    def forward(self, x, offset: int = 0, positions=None):
+        # x: (batch, seq, d_model)；offset 为增量解码时已缓存的位置数
+        # positions: (batch, seq) 每个 token 的位置（左填充的批量生成中各行不同）
+        if positions is not None:
+            return x + self.pe[positions]
         seq_len = x.size(1)
-        return x + self.pe[:seq_len].unsqueeze(0)
+        return x + self.pe[offset:offset + seq_len].unsqueeze(0)
+
+class LayerKVCache:
+    """单层的 key/value 缓存，按 max_len 预分配，避免每步 torch.cat 重新分配内存"""
+    def __init__(self, max_len: int):
+        self.max_len = max_len
+        self.k = None  # (B, n_heads, max_len, head_dim)
+        self.v = None
+        self.length = 0
+
+    def update(self, k, v):
+        # k, v: (B, n_heads, T_new, head_dim)，追加后返回全部已缓存的 k, v
+        B, H, T, D = k.shape
+        if self.k is None:
+            self.k = k.new_empty(B, H, self.max_len, D)
+            self.v = v.new_empty(B, H, self.max_len, D)
+        self.k[:, :, self.length:self.length + T] = k
+        self.v[:, :, self.length:self.length + T] = v
+        self.length += T
+        return self.k[:, :, :self.length], self.v[:, :, :self.length]
+
+    def select(self, rows):
+        # 只保留 rows 指定的批次行（批量生成中丢弃已完成的序列）
+        if self.k is not None:
+            self.k = self.k.index_select(0, rows)
+            self.v = self.v.index_select(0, rows)
+
+    def truncate(self, length: int):
+        # 丢弃 length 之后的位置（投机解码中回退未被接受的草稿 token），后续 update 会直接覆盖
+        self.length = min(self.length, length)
+
+class KVCache:
+    """整个模型的 KV 缓存：每个 TransformerBlock 对应一个 LayerKVCache"""
+    def __init__(self, n_layers: int, max_len: int):
+        self.layers = [LayerKVCache(max_len) for _ in range(n_layers)]
+
+    @property
+    def length(self) -> int:
+        return self.layers[0].length
+
+    def select(self, rows):
+        for layer in self.layers:
+            layer.select(rows)
+
+    def truncate(self, length: int):
+        for layer in self.layers:
+            layer.truncate(length)
+
+def _per_row(value, n, default):
+    """把标量或列表形式的采样参数展开为长度为 n 的列表"""
+    if value is None:
+        return [default] * n
+    if isinstance(value, (list, tuple)):
+        assert len(value) == n
+        return [default if v is None else v for v in value]
+    return [value] * n
+
+def _filtered_probs(logits, temperature, top_k, top_p):
+    """按概率降序排列并做 temperature / top-k / top-p 处理，返回 (sorted_probs, sorted_idx)"""
+    logits = logits / temperature.clamp(min=1e-5).unsqueeze(-1)
+    sorted_logits, sorted_idx = torch.sort(logits, dim=-1, descending=True)
+    ranks = torch.arange(logits.size(-1), device=logits.device).unsqueeze(0)
+    k = torch.where(top_k > 0, top_k, torch.full_like(top_k, logits.size(-1)))
+    remove = ranks >= k.unsqueeze(-1)
+    probs = F.softmax(sorted_logits.masked_fill(remove, float("-inf")), dim=-1)
+    # top-p：去掉累计概率（不含自身）已超过 top_p 的 token，至少保留概率最大的一个
+    remove |= ((probs.cumsum(dim=-1) - probs) >= top_p.unsqueeze(-1)) & (top_p < 1).unsqueeze(-1)
+    return F.softmax(sorted_logits.masked_fill(remove, float("-inf")), dim=-1), sorted_idx
+
+def sample_next(logits, temperature, top_k, top_p):
+    """
+    按行采样下一个 token。
+    logits: (B, V)；temperature / top_k / top_p: (B,) 张量。
+    temperature <= 0 表示贪心解码；top_k <= 0 和 top_p >= 1 表示不做截断。
+    """
+    greedy = temperature <= 0
+    probs, sorted_idx = _filtered_probs(logits, temperature, top_k, top_p)
+    choice = torch.multinomial(probs, num_samples=1)
+    choice = torch.where(greedy.unsqueeze(-1), torch.zeros_like(choice), choice)
+    return sorted_idx.gather(-1, choice).squeeze(-1)
+
+def token_probs(logits, temperature, top_k, top_p):
+    """
+    与 sample_next 相同的采样分布，但按词表顺序返回完整的概率 (B, V)；
+    贪心解码（temperature <= 0）对应概率最大 token 的 one-hot 分布。
+    """
+    sorted_probs, sorted_idx = _filtered_probs(logits, temperature, top_k, top_p)
+    probs = torch.zeros_like(sorted_probs).scatter(-1, sorted_idx, sorted_probs)
+    one_hot = F.one_hot(sorted_idx[:, 0], logits.size(-1)).to(probs.dtype)
+    return torch.where((temperature <= 0).unsqueeze(-1), one_hot, probs)
+
+ATTN_BACKENDS = ("auto", "sdpa", "manual")
 
 class MultiHeadAttention(nn.Module):
-    def __init__(self, d_model, n_heads, dropout=0.0):
+    def __init__(self, d_model, n_heads, dropout=0.0, attn_backend="auto"):
         super().__init__()
         assert d_model % n_heads == 0
+        assert attn_backend in ATTN_BACKENDS
         self.n_heads = n_heads
         self.head_dim = d_model // n_heads
         self.qkv = nn.Linear(d_model, 3 * d_model)
         self.out = nn.Linear(d_model, d_model)
         self.dropout = nn.Dropout(dropout)
+        # auto：PyTorch 提供融合的 scaled_dot_product_attention 时使用它，否则回退到手写实现
+        has_sdpa = hasattr(F, "scaled_dot_product_attention")
+        if attn_backend == "sdpa" and not has_sdpa:
+            raise RuntimeError("当前 PyTorch 版本不支持 scaled_dot_product_attention")
+        self.use_sdpa = attn_backend == "sdpa" or (attn_backend == "auto" and has_sdpa)
 
-    def forward(self, x, mask=None):
+    def forward(self, x, mask=None, kv_cache=None, is_causal=False):
+        # is_causal=True 表示 mask 就是标准下三角因果掩码，融合路径可以不物化 (T, T) 掩码
         B, T, C = x.shape
         qkv = self.qkv(x)  # (B, T, 3C)
         q, k, v = qkv.chunk(3, dim=-1)
@@ -38,8 +139,24 @@ class MultiHeadAttention(nn.Module):
         def split_heads(t):  # (B, T, C) -> (B, n_heads, T, head_dim)
             return t.view(B, T, self.n_heads, self.head_dim).transpose(1, 2)
         q, k, v = split_heads(q), split_heads(k), split_heads(v)
+        if kv_cache is not None:
+            # 增量解码：把新 token 的 k, v 追加进缓存，q 只包含新 token
+            k, v = kv_cache.update(k, v)
+        if self.use_sdpa:
+            # 融合实现：不构建完整的 (B, H, T, T) 注意力矩阵
+            out = F.scaled_dot_product_attention(
+                q, k, v,
+                attn_mask=None if is_causal or mask is None else mask.bool(),
+                dropout_p=self.dropout.p if self.training else 0.0,
+                is_causal=is_causal,
+            )
+            out = out.transpose(1, 2).contiguous().view(B, T, C)
+            return self.out(out)
         # scaled dot-product attention
         att = (q @ k.transpose(-2, -1)) / math.sqrt(self.head_dim)
+        if is_causal:
+            # 手写路径本身就要物化 (T, T) 注意力矩阵，这里按当前长度构建因果掩码即可
+            mask = torch.ones(T, k.size(-2), dtype=torch.bool, device=x.device).tril()
         if mask is not None:
             att = att.masked_fill(mask == 0, float("-inf"))
         att = F.softmax(att, dim=-1)
@@ -61,53 +178,251 @@ class FeedForward(nn.Module):
     def forward(self, x): return self.net(x)
 
 class TransformerBlock(nn.Module):
-    def __init__(self, d_model, n_heads, d_ff, dropout=0.0):
+    def __init__(self, d_model, n_heads, d_ff, dropout=0.0, attn_backend="auto"):
         super().__init__()
         self.ln1 = nn.LayerNorm(d_model)
-        self.attn = MultiHeadAttention(d_model, n_heads, dropout)
+        self.attn = MultiHeadAttention(d_model, n_heads, dropout, attn_backend)
         self.ln2 = nn.LayerNorm(d_model)
         self.ff = FeedForward(d_model, d_ff, dropout)
 
-    def forward(self, x, mask=None):
-        x = x + self.attn(self.ln1(x), mask)
+    def forward(self, x, mask=None, kv_cache=None, is_causal=False):
+        x = x + self.attn(self.ln1(x), mask, kv_cache, is_causal)
         x = x + self.ff(self.ln2(x))
         return x
 
 class TransformerLM(nn.Module):
-    def __init__(self, vocab_size, d_model=256, n_heads=8, d_ff=1024, n_layers=4, block_size=128, dropout=0.1):
+    def __init__(self, vocab_size, d_model=256, n_heads=8, d_ff=1024, n_layers=4, block_size=128, dropout=0.1,
+                 attn_backend="auto"):
         super().__init__()
         self.block_size = block_size
         self.tok_emb = nn.Embedding(vocab_size, d_model)
         self.pos_enc = PositionalEncoding(d_model, max_len=block_size)
         self.blocks = nn.ModuleList([
-            TransformerBlock(d_model, n_heads, d_ff, dropout) for _ in range(n_layers)
+            TransformerBlock(d_model, n_heads, d_ff, dropout, attn_backend) for _ in range(n_layers)
         ])
         self.ln_f = nn.LayerNorm(d_model)
         self.head = nn.Linear(d_model, vocab_size, bias=False)
+        # 不再注册 (block_size, block_size) 的 causal_mask 缓冲区：训练走 is_causal=True 的融合路径，
+        # 只有 KV 缓存 / 左填充路径才按当前长度构建布尔掩码，显存与 checkpoint 大小不随 block_size 平方增长
 
-        # causal mask for autoregressive LM
-        mask = torch.tril(torch.ones(block_size, block_size)).unsqueeze(0).unsqueeze(0)
-        self.register_buffer("causal_mask", mask)
+    @property
+    def device(self):
+        # 词嵌入不会被动态量化，量化模型也能据此取得所在设备
+        return self.tok_emb.weight.device
 
-    def forward(self, idx):
-        # idx: (B, T) tokens
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # 兼容旧 checkpoint：其中保存了已移除的 causal_mask 缓冲区
+        state_dict.pop(prefix + "causal_mask", None)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def forward(self, idx, kv_cache=None, attention_mask=None, positions=None):
+        # idx: (B, T) tokens；传入 kv_cache 时 idx 只包含尚未缓存的新 token
+        # attention_mask: (B, past + T)，True 表示真实 token，False 表示左填充
+        # positions: (B, T) 每个新 token 的位置，左填充时由调用方提供
         B, T = idx.shape
+        past = kv_cache.length if kv_cache is not None else 0
         x = self.tok_emb(idx)                      # (B, T, C)
-        x = self.pos_enc(x)                        # (B, T, C)
-        # build mask for current T
-        mask = self.causal_mask[:, :, :T, :T]
-        for blk in self.blocks:
-            x = blk(x, mask=mask)
+        x = self.pos_enc(x, offset=past, positions=positions)  # (B, T, C)
+        # 没有缓存也没有填充时就是标准因果注意力，不需要显式掩码
+        is_causal = past == 0 and attention_mask is None
+        mask = None
+        if not is_causal:
+            # build mask for current T（新 token 可以看到全部已缓存的位置）：(1, 1, T, past + T) 布尔掩码
+            keys = torch.arange(past + T, device=idx.device).unsqueeze(0)
+            queries = (past + torch.arange(T, device=idx.device)).unsqueeze(1)
+            mask = (keys <= queries)[None, None]
+            if attention_mask is not None:
+                # 屏蔽填充位置；填充 token 自身仍可看到自己，避免整行 -inf 导致 softmax 出现 NaN
+                mask = (mask & attention_mask[:, None, None, :]) | (keys == queries)
+        for i, blk in enumerate(self.blocks):
+            x = blk(x, mask=mask, kv_cache=kv_cache.layers[i] if kv_cache is not None else None,
+                    is_causal=is_causal)
         x = self.ln_f(x)
         logits = self.head(x)                      # (B, T, vocab_size)
         return logits
 
     @torch.no_grad()
-    def generate(self, idx, max_new_tokens):
+    def generate(self, idx, max_new_tokens, use_cache=True):
+        """
+        自回归生成。use_cache=True 时使用 KV 缓存：先对 prompt 做一次完整前向（prefill），
+        之后每步只计算最新的一个 token。
+
+        序列长度不超过 block_size 时，缓存路径与不缓存路径在相同随机种子下的输出一致。
+        超过 block_size 后缓存需要滑动：由于使用绝对位置编码，旧的 k/v 无法平移复用，
+        因此淘汰最旧的一半窗口，并用最近的 block_size // 2 个 token 重新 prefill，
+        均摊下来每个 token 仍只需 O(1) 次单 token 前向加少量重建开销。
+        """
+        if not use_cache:
+            for _ in range(max_new_tokens):
+                idx_cond = idx[:, -self.block_size:]
+                logits = self.forward(idx_cond)
+                probs = F.softmax(logits[:, -1, :], dim=-1)
+                next_id = torch.multinomial(probs, num_samples=1)
+                idx = torch.cat([idx, next_id], dim=1)
+            return idx
+
+        kv_cache = None
+        next_input = None
         for _ in range(max_new_tokens):
-            idx_cond = idx[:, -self.block_size:]
-            logits = self.forward(idx_cond)
+            if kv_cache is None or kv_cache.length >= self.block_size:
+                # prefill：首次调用，或缓存窗口已满需要滑动
+                keep = self.block_size if kv_cache is None else self.block_size // 2
+                kv_cache = KVCache(len(self.blocks), self.block_size)
+                logits = self.forward(idx[:, -keep:], kv_cache=kv_cache)
+            else:
+                logits = self.forward(next_input, kv_cache=kv_cache)
             probs = F.softmax(logits[:, -1, :], dim=-1)
             next_id = torch.multinomial(probs, num_samples=1)
             idx = torch.cat([idx, next_id], dim=1)
+            next_input = next_id
         return idx
+
+    @torch.no_grad()
+    def generate_batch(self, prompts, max_new_tokens=100, temperature=1.0, top_k=None, top_p=None,
+                       eos_id=None, pad_id=0):
+        """
+        批量生成：一次处理多个长度不同的 prompt。
+
+        prompts: List[List[int]]，左填充到相同长度，并通过 attention mask 屏蔽填充位置。
+        max_new_tokens / temperature / top_k / top_p 可以是标量，也可以是与 prompts 等长的列表（逐序列设置）。
+        序列生成 eos_id 或达到各自的 max_new_tokens 后立即结束，并从活动批次中移除，
+        后续步骤的计算量随之减少。
+        返回: List[List[int]]，每个序列的 prompt + 生成的 token。
+        """
+        device = self.device
+        n = len(prompts)
+        outputs = [list(p) for p in prompts]
+        budgets = _per_row(max_new_tokens, n, 0)
+        temps = torch.tensor(_per_row(temperature, n, 1.0), dtype=torch.float, device=device)
+        top_ks = torch.tensor(_per_row(top_k, n, 0), dtype=torch.long, device=device)
+        top_ps = torch.tensor(_per_row(top_p, n, 1.0), dtype=torch.float, device=device)
+
+        active = [i for i in range(n) if budgets[i] > 0 and len(prompts[i]) > 0]
+        if not active:
+            return outputs
+
+        # 左填充，超过 block_size 的 prompt 只保留最后 block_size 个 token
+        width = min(max(len(prompts[i]) for i in active), self.block_size)
+        tokens = torch.full((len(active), width), pad_id, dtype=torch.long, device=device)
+        valid = torch.zeros((len(active), width), dtype=torch.bool, device=device)
+        for row, i in enumerate(active):
+            p = prompts[i][-width:]
+            tokens[row, width - len(p):] = torch.tensor(p, dtype=torch.long, device=device)
+            valid[row, width - len(p):] = True
+
+        rows = torch.tensor(active, device=device)
+        remaining = torch.tensor([budgets[i] for i in active], device=device)
+
+        def prefill(tokens, valid):
+            kv_cache = KVCache(len(self.blocks), self.block_size)
+            positions = (valid.long().cumsum(dim=-1) - 1).clamp(min=0)
+            logits = self.forward(tokens, kv_cache=kv_cache, attention_mask=valid, positions=positions)
+            return kv_cache, logits[:, -1, :], positions[:, -1] + 1
+
+        kv_cache, logits, next_pos = prefill(tokens, valid)
+        while True:
+            next_id = sample_next(logits, temps[rows], top_ks[rows], top_ps[rows])
+            for i, t in zip(rows.tolist(), next_id.tolist()):
+                outputs[i].append(t)
+
+            remaining -= 1
+            finished = remaining <= 0
+            if eos_id is not None:
+                finished |= next_id == eos_id
+            if finished.any():
+                keep = (~finished).nonzero(as_tuple=True)[0]
+                if keep.numel() == 0:
+                    break
+                kv_cache.select(keep)
+                rows, remaining, next_id, next_pos = rows[keep], remaining[keep], next_id[keep], next_pos[keep]
+                tokens, valid = tokens[keep], valid[keep]
+
+            tokens = torch.cat([tokens, next_id.unsqueeze(1)], dim=1)
+            valid = torch.cat([valid, torch.ones_like(next_id, dtype=torch.bool).unsqueeze(1)], dim=1)
+            if kv_cache.length >= self.block_size:
+                # 缓存窗口已满：与 generate 相同，保留最近 block_size // 2 个位置重新 prefill
+                keep_len = self.block_size // 2
+                tokens, valid = tokens[:, -keep_len:], valid[:, -keep_len:]
+                kv_cache, logits, next_pos = prefill(tokens, valid)
+            else:
+                logits = self.forward(next_id.unsqueeze(1), kv_cache=kv_cache, attention_mask=valid,
+                                      positions=next_pos.unsqueeze(1))[:, -1, :]
+                next_pos = next_pos + 1
+        return outputs
+
+    @torch.no_grad()
+    def generate_speculative(self, idx, draft, max_new_tokens, k=4, temperature=1.0, top_k=None, top_p=None):
+        """
+        投机解码：较小的草稿模型 draft（相同分词器）逐个提出 k 个候选 token，
+        主模型（self）用一次前向同时算出这 k 个位置以及之后一个位置的分布，再逐个做接受/拒绝采样：
+        候选 d 以 min(1, p(d) / q(d)) 的概率被接受；第一个被拒绝的位置从 max(0, p - q) 归一化后的分布重新采样，
+        k 个全部接受时额外从主模型的下一个分布采样一个 token。
+        这样得到的序列分布与只用主模型逐 token 采样（temperature / top_k / top_p 相同）完全一致，
+        每次主模型前向至少产出 1 个、至多 k + 1 个 token。
+
+        idx: (1, T)，只支持单条序列。
+        返回: (idx, stats)，stats 记录主模型验证次数 verify_steps、草稿 token 数 drafted 与被接受数 accepted。
+        """
+        assert idx.size(0) == 1, "投机解码只支持 batch size 为 1"
+        window = min(self.block_size, draft.block_size)
+        assert 0 < k < window // 2
+        device = idx.device
+        params = (torch.tensor([temperature], dtype=torch.float, device=device),
+                  torch.tensor([top_k or 0], dtype=torch.long, device=device),
+                  torch.tensor([1.0 if top_p is None else top_p], dtype=torch.float, device=device))
+        stats = {"verify_steps": 0, "drafted": 0, "accepted": 0}
+
+        # 两个缓存都只保存 idx[:, start:-1]，最后一个已确定的 token 在下一轮与候选 token 一起输入
+        target_cache = draft_cache = None
+        start = 0
+        generated = 0
+        while generated < max_new_tokens:
+            n_draft = min(k, max_new_tokens - generated - 1)
+            length = idx.size(1)
+            if target_cache is None or length - start + n_draft > window:
+                # 首次调用，或缓存窗口放不下本轮候选：与 generate 相同，保留最近的一段 token 重新 prefill
+                keep = window - k if target_cache is None else window // 2
+                start = max(0, length - keep)
+                target_cache = KVCache(len(self.blocks), window)
+                draft_cache = KVCache(len(draft.blocks), window)
+
+            drafts, qs = [], []
+            if n_draft > 0:
+                logits = draft(idx[:, start + draft_cache.length:], kv_cache=draft_cache)[:, -1]
+                for i in range(n_draft):
+                    q = token_probs(logits, *params)
+                    d = torch.multinomial(q, num_samples=1)
+                    drafts.append(d)
+                    qs.append(q[0])
+                    if i < n_draft - 1:
+                        logits = draft(d, kv_cache=draft_cache)[:, -1]
+            draft_ids = torch.cat(drafts, dim=1) if drafts else idx.new_empty(1, 0)
+
+            # 一次前向验证全部候选：得到 n_draft + 1 个位置的主模型分布
+            pending = idx[:, start + target_cache.length:]
+            logits = self.forward(torch.cat([pending, draft_ids], dim=1), kv_cache=target_cache)[0, -(n_draft + 1):]
+            p = token_probs(logits, *(t.expand(n_draft + 1) for t in params))
+            stats["verify_steps"] += 1
+            stats["drafted"] += n_draft
+
+            n_accepted = 0
+            for i in range(n_draft):
+                d = draft_ids[0, i]
+                if torch.rand((), device=device) < p[i, d] / qs[i][d]:
+                    n_accepted += 1
+                    continue
+                residual = (p[i] - qs[i]).clamp(min=0)
+                if residual.sum() <= 0:  # 数值误差导致 p 与 q 几乎相同时退回 p
+                    residual = p[i]
+                next_id = torch.multinomial(residual / residual.sum(), num_samples=1)
+                break
+            else:
+                next_id = torch.multinomial(p[n_draft], num_samples=1)
+            stats["accepted"] += n_accepted
+
+            idx = torch.cat([idx, draft_ids[:, :n_accepted], next_id.view(1, 1)], dim=1)
+            generated += n_accepted + 1
+            # 回退缓存中未被接受的候选，使两个缓存重新只覆盖 idx[:, start:-1]
+            target_cache.truncate(length - start + n_accepted)
+            draft_cache.truncate(length - start + n_accepted)
+        return idx, stats
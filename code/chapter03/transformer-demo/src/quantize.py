@@ -0,0 +1,61 @@
+# src/quantize.py
+# CPU 推理用的动态 int8 量化：nn.Linear（qkv、out、FFN、head）的权重量化为 int8，激活在运行时动态量化
+# 用法: python quantize.py [--ckpt checkpoints/ckpt-0002000.pt] [--out ckpt-int8.pt]
+import argparse
+import torch
+import torch.nn as nn
+from model import TransformerLM
+from config import Config
+from checkpoint import latest_checkpoint, atomic_save
+
+def build_model(cfg, vocab_size: int):
+    return TransformerLM(
+        vocab_size=vocab_size,
+        d_model=cfg.d_model,
+        n_heads=cfg.n_heads,
+        d_ff=cfg.d_ff,
+        n_layers=cfg.n_layers,
+        block_size=cfg.block_size,
+        dropout=cfg.dropout,
+        attn_backend=cfg.attn_backend,
+    )
+
+def quantize_int8(model):
+    """对所有 nn.Linear 做动态 int8 量化；Embedding、LayerNorm 保持 fp32。量化模型只能在 CPU 上运行"""
+    return torch.ao.quantization.quantize_dynamic(model.cpu().eval(), {nn.Linear}, dtype=torch.qint8)
+
+def load_model(ckpt, cfg, device: str = "cpu", quantize: bool = False):
+    """
+    从检查点构建推理模型。ckpt["quantized"] 为 True 时是已量化的检查点，
+    先把 fp32 模型量化成相同结构再加载；quantize=True 时把 fp32 检查点量化后返回。
+    量化模型总是在 CPU 上，忽略 device。
+    """
+    model = build_model(cfg, ckpt["model"]["tok_emb.weight"].shape[0])
+    if ckpt.get("quantized"):
+        model = quantize_int8(model)
+        model.load_state_dict(ckpt["model"])
+        return model
+    model.load_state_dict(ckpt["model"])
+    if quantize:
+        return quantize_int8(model)
+    return model.to(device).eval()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt", default=None, help="fp32 检查点，默认使用 ckpt_dir 中最新的检查点")
+    parser.add_argument("--out", default="ckpt-int8.pt")
+    args = parser.parse_args()
+
+    cfg = Config()
+    ckpt_path = args.ckpt or latest_checkpoint(cfg.ckpt_dir)
+    if ckpt_path is None:
+        raise FileNotFoundError(f"{cfg.ckpt_dir} 中没有检查点，请先运行 train.py")
+    ckpt = torch.load(ckpt_path, map_location="cpu")
+    model = load_model(ckpt, cfg, quantize=True)
+    # 只保留推理需要的内容，不带优化器等训练状态
+    atomic_save({"model": model.state_dict(), "tok": ckpt["tok"], "tokenizer": ckpt["tokenizer"],
+                 "quantized": True}, args.out)
+    print(f"saved {args.out}")
+
+if __name__ == "__main__":
+    main()
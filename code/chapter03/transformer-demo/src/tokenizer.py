@@ -1,13 +1,215 @@
 # src/tokenizer.py
+import heapq
+import re
+from collections import Counter
+
+import numpy as np
+
 class CharTokenizer:
     def __init__(self, text: str):
         chars = sorted(list(set(text)))
         self.stoi = {ch: i for i, ch in enumerate(chars)}
         self.itos = {i: ch for ch, i in self.stoi.items()}
         self.vocab_size = len(self.stoi)
+        self._lut = None    # 码位 -> id 的查找表，未知字符为 -1
+        self._codes = None  # id -> 码位
+
+    @classmethod
+    def from_stoi(cls, stoi):
+        tok = cls("")
+        tok.stoi = dict(stoi)
+        tok.itos = {i: ch for ch, i in tok.stoi.items()}
+        tok.vocab_size = len(tok.stoi)
+        return tok
+
+    def _tables(self):
+        # 首次编码/解码时根据 stoi 构建 NumPy 查找表
+        if self._lut is None:
+            max_code = max((ord(ch) for ch in self.stoi), default=0)
+            self._lut = np.full(max_code + 1, -1, dtype=np.int64)
+            self._codes = np.zeros(self.vocab_size, dtype=np.uint32)
+            for ch, i in self.stoi.items():
+                self._lut[ord(ch)] = i
+                self._codes[i] = ord(ch)
+        return self._lut, self._codes
+
+    def _lookup(self, s: str):
+        # 返回每个字符对应的 id（未知字符为 -1）
+        lut, _ = self._tables()
+        codes = np.frombuffer(s.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        ids = np.full(codes.shape, -1, dtype=np.int64)
+        known = codes < len(lut)
+        ids[known] = lut[codes[known]]
+        return ids
+
+    def encode_array(self, s: str):
+        """向量化编码：UTF-32 码位数组查表，未知字符与 encode 一样被跳过"""
+        ids = self._lookup(s)
+        return ids[ids >= 0]
+
+    def encode(self, s: str):
+        return self.encode_array(s).tolist()
+
+    def decode(self, ids):
+        _, codes = self._tables()
+        ids = np.asarray(ids, dtype=np.int64)
+        ids = ids[(ids >= 0) & (ids < self.vocab_size)]
+        return codes[ids].tobytes().decode("utf-32-le", "surrogatepass")
+
+    def encode_batch(self, texts):
+        """批量编码：拼接后一次查表，再按每个字符串的有效字符数切分"""
+        if not texts:
+            return []
+        ids = self._lookup("".join(texts))
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+        owner = np.repeat(np.arange(len(texts)), lengths)
+        valid = ids >= 0
+        counts = np.bincount(owner[valid], minlength=len(texts))
+        return [chunk.tolist() for chunk in np.split(ids[valid], np.cumsum(counts)[:-1])]
+
+    def decode_batch(self, batch):
+        """批量解码：拼接所有 id 一次解码，再按每条序列的有效 id 数切分"""
+        if not batch:
+            return []
+        text = self.decode(np.concatenate([np.asarray(ids, dtype=np.int64) for ids in batch]))
+        out, start = [], 0
+        for ids in batch:
+            ids = np.asarray(ids, dtype=np.int64)
+            n = int(((ids >= 0) & (ids < self.vocab_size)).sum())
+            out.append(text[start:start + n])
+            start += n
+        return out
+
+# 预分词：英文单词、数字、空白、其他字符（含中文）连续片段；BPE 合并不会跨越片段边界
+_PRETOKENIZE = re.compile(r"""'(?:s|t|re|ve|m|ll|d)| ?[A-Za-z]+| ?\d+| ?[^\sA-Za-z\d]+|\s+(?!\S)|\s+""")
+
+class ByteBPETokenizer:
+    """
+    字节级 BPE 分词器，接口与 CharTokenizer 相同（encode / decode / vocab_size）。
+    基础词表为 256 个字节，任何文本都能无损编码；训练时反复合并出现次数最多的相邻 token 对。
+    """
+    def __init__(self, merges=None):
+        self.merges = [tuple(m) for m in (merges or [])]
+        self.ranks = {pair: i for i, pair in enumerate(self.merges)}
+        self.vocab = [bytes([i]) for i in range(256)]
+        for a, b in self.merges:
+            self.vocab.append(self.vocab[a] + self.vocab[b])
+        self.vocab_size = len(self.vocab)
+        self._cache = {}
+
+    @classmethod
+    def train(cls, text: str, vocab_size: int, verbose: bool = False):
+        """
+        训练 BPE：相同的预分词片段合并计数；用最大堆维护 token 对计数（惰性删除过期条目），
+        每次合并只重新统计包含该 token 对的片段，而不是每轮都重新扫描整个语料。
+        """
+        word_counts = Counter(_PRETOKENIZE.findall(text))
+        words = [list(w.encode("utf-8")) for w in word_counts]
+        freqs = list(word_counts.values())
+
+        pair_counts = Counter()
+        where = {}  # token 对 -> 包含它的片段下标
+        for wi, (w, f) in enumerate(zip(words, freqs)):
+            for pair in zip(w, w[1:]):
+                pair_counts[pair] += f
+                where.setdefault(pair, set()).add(wi)
+        heap = [(-c, pair) for pair, c in pair_counts.items()]
+        heapq.heapify(heap)
+
+        merges = []
+        while 256 + len(merges) < vocab_size and heap:
+            neg, pair = heapq.heappop(heap)
+            if pair_counts.get(pair, 0) != -neg or -neg <= 0:
+                continue  # 过期条目
+            new_id = 256 + len(merges)
+            merges.append(pair)
+            changed = set()
+            for wi in where.pop(pair, ()):
+                w, f = words[wi], freqs[wi]
+                for p in zip(w, w[1:]):
+                    pair_counts[p] -= f
+                    changed.add(p)
+                merged, i = [], 0
+                while i < len(w):
+                    if i + 1 < len(w) and w[i] == pair[0] and w[i + 1] == pair[1]:
+                        merged.append(new_id)
+                        i += 2
+                    else:
+                        merged.append(w[i])
+                        i += 1
+                words[wi] = merged
+                for p in zip(merged, merged[1:]):
+                    pair_counts[p] += f
+                    where.setdefault(p, set()).add(wi)
+                    changed.add(p)
+            pair_counts.pop(pair, None)
+            for p in changed:
+                c = pair_counts.get(p, 0)
+                if c > 0:
+                    heapq.heappush(heap, (-c, p))
+                else:
+                    pair_counts.pop(p, None)
+            if verbose and len(merges) % 500 == 0:
+                print(f"bpe merges: {len(merges)}")
+        return cls(merges)
+
+    def state_dict(self):
+        return {"merges": [list(m) for m in self.merges]}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["merges"])
+
+    def _encode_chunk(self, chunk: str):
+        ids = self._cache.get(chunk)
+        if ids is not None:
+            return ids
+        ids = list(chunk.encode("utf-8"))
+        while len(ids) > 1:
+            # 找到排名最靠前（最早学到）的 token 对并合并其全部出现位置
+            pair = min(zip(ids, ids[1:]), key=lambda p: self.ranks.get(p, float("inf")))
+            rank = self.ranks.get(pair)
+            if rank is None:
+                break
+            merged, i = [], 0
+            while i < len(ids):
+                if i + 1 < len(ids) and ids[i] == pair[0] and ids[i + 1] == pair[1]:
+                    merged.append(256 + rank)
+                    i += 2
+                else:
+                    merged.append(ids[i])
+                    i += 1
+            ids = merged
+        if len(self._cache) < 100_000:
+            self._cache[chunk] = ids
+        return ids
 
     def encode(self, s: str):
-        return [self.stoi[ch] for ch in s if ch in self.stoi]
+        ids = []
+        for chunk in _PRETOKENIZE.findall(s):
+            ids.extend(self._encode_chunk(chunk))
+        return ids
+
+    def encode_array(self, s: str):
+        return np.asarray(self.encode(s), dtype=np.int64)
 
     def decode(self, ids):
-        return "".join(self.itos[i] for i in ids if i in self.itos)
+        data = b"".join(self.vocab[i] for i in ids if 0 <= i < self.vocab_size)
+        return data.decode("utf-8", errors="replace")
+
+def build_tokenizer(kind: str, text: str, vocab_size: int = 4096):
+    """根据 Config.tokenizer 训练分词器：char 或 bpe"""
+    if kind == "bpe":
+        return ByteBPETokenizer.train(text, vocab_size, verbose=True)
+    return CharTokenizer(text)
+
+def tokenizer_state(tok):
+    """分词器的可序列化状态，保存到 ckpt.pt 与 token 文件的元信息中"""
+    if isinstance(tok, ByteBPETokenizer):
+        return "bpe", tok.state_dict()
+    return "char", tok.stoi
+
+def load_tokenizer(kind: str, state):
+    if kind == "bpe":
+        return ByteBPETokenizer.from_state(state)
+    return CharTokenizer.from_stoi(state)
@@ -1,43 +1,64 @@
 # src/train.py
+import argparse
 import os
+import time
 import torch
 import numpy as np
-import pdfplumber
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import DataLoader
 from tqdm import tqdm
 from config import Config
-from tokenizer import CharTokenizer
+from tokenizer import build_tokenizer, tokenizer_state, load_tokenizer
 from model import TransformerLM
-
-class TextDataset(Dataset):
-    def __init__(self, ids, block_size):
-        self.ids = ids
-        self.block_size = block_size
-    def __len__(self): return len(self.ids) - self.block_size
-    def __getitem__(self, i):
-        x = torch.tensor(self.ids[i:i+self.block_size], dtype=torch.long)
-        y = torch.tensor(self.ids[i+1:i+1+self.block_size], dtype=torch.long)
-        return x, y
+from dataset import MemmapTextDataset, ResumableRandomSampler, write_token_file, read_token_meta
+from corpus import build_corpus
+from checkpoint import AsyncCheckpointer, latest_checkpoint, capture_rng_state, restore_rng_state
+
+def prepare_tokens(cfg):
+    """
+    构建（或复用缓存的）训练语料：PDF -> 文本 -> token 文件。
+    token 文件与词表只在语料变化时生成一次，重启训练时直接读取缓存。
+    """
+    corpus_path = build_corpus(cfg.data_path, cfg.cache_dir, cfg.extract_workers)
+    suffix = f".bpe{cfg.bpe_vocab_size}.bin" if cfg.tokenizer == "bpe" else ".char.bin"
+    token_path = os.path.splitext(corpus_path)[0] + suffix
+    meta = read_token_meta(token_path)
+    if meta is None:
+        with open(corpus_path, encoding="utf-8") as f:
+            text = f.read()
+        tok = build_tokenizer(cfg.tokenizer, text, cfg.bpe_vocab_size)
+        kind, state = tokenizer_state(tok)
+        write_token_file(tok.encode_array(text), token_path, tok.vocab_size, meta={"tokenizer": kind, "tok": state})
+    else:
+        tok = load_tokenizer(meta["tokenizer"], meta["tok"])
+    return tok, token_path
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", nargs="?", const="latest", default=None,
+                        help="从检查点恢复训练；不带路径时使用 ckpt_dir 中最新的检查点")
+    parser.add_argument("--draft", action="store_true", help="训练投机解码用的小草稿模型（尺寸见 Config.draft_*）")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     cfg = Config()
+    if args.draft:
+        cfg = cfg.draft()
     device = "cuda" if torch.cuda.is_available() else "cpu"
     cfg.device = device
+    torch.manual_seed(cfg.seed)
 
-    import pdfplumber
-
-    with pdfplumber.open("data/LLMBook.pdf") as pdf:
-        text = ""
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-
-
-    tok = CharTokenizer(text)
-    ids = tok.encode(text)
+    # 预处理：token id 写入二进制文件，训练时通过 memmap 读取
+    tok, token_path = prepare_tokens(cfg)
     cfg.vocab_size = tok.vocab_size
 
-    ds = TextDataset(ids, cfg.block_size)
-    dl = DataLoader(ds, batch_size=cfg.batch_size, shuffle=True, drop_last=True)
+    ds = MemmapTextDataset(token_path, cfg.block_size)
+    # 采样顺序只由 seed 和 epoch 决定，恢复训练时可以从中断的 batch 继续
+    sampler = ResumableRandomSampler(len(ds), cfg.seed)
+    # DataLoader 使用独立的 generator 生成 worker 种子，重建迭代器不会改变全局随机数序列（dropout）
+    dl = DataLoader(ds, batch_size=cfg.batch_size, sampler=sampler, drop_last=True,
+                    num_workers=cfg.num_workers, persistent_workers=cfg.num_workers > 0,
+                    generator=torch.Generator().manual_seed(cfg.seed))
 
     model = TransformerLM(
         vocab_size=cfg.vocab_size,
@@ -47,41 +68,93 @@ def main():
         n_layers=cfg.n_layers,
         block_size=cfg.block_size,
         dropout=cfg.dropout,
+        attn_backend=cfg.attn_backend,
     ).to(device)
-
-    opt = torch.optim.AdamW(model.parameters(), lr=cfg.lr)
-    scaler = torch.cuda.amp.GradScaler(enabled=(device == "cuda"))
+    # 编译后的模块 state_dict 会带 _orig_mod 前缀，检查点始终从原始模块保存
+    raw_model = model
+    if cfg.compile:
+        model = torch.compile(model)
+
+    opt = torch.optim.AdamW(raw_model.parameters(), lr=cfg.lr)
+    scaler = torch.amp.GradScaler(device, enabled=(device == "cuda"))
+    # CUDA 使用 fp16 + GradScaler；CPU 可选 bf16（不需要 loss scaling）
+    amp_dtype = torch.float16 if device == "cuda" else torch.bfloat16
+    amp_enabled = device == "cuda" or cfg.bf16_cpu
+    checkpointer = AsyncCheckpointer(cfg.ckpt_dir, cfg.keep_last)
+
+    start_step, epoch, batch_in_epoch = 0, 0, 0
+    if args.resume:
+        path = latest_checkpoint(cfg.ckpt_dir) if args.resume == "latest" else args.resume
+        if path is None:
+            raise FileNotFoundError(f"{cfg.ckpt_dir} 中没有可恢复的检查点")
+        ckpt = torch.load(path, map_location=device)
+        if ckpt["tokenizer"] != tokenizer_state(tok)[0]:
+            raise ValueError(f"检查点使用 {ckpt['tokenizer']} 分词器，与当前配置 {cfg.tokenizer} 不一致")
+        raw_model.load_state_dict(ckpt["model"])
+        opt.load_state_dict(ckpt["optimizer"])
+        scaler.load_state_dict(ckpt["scaler"])
+        restore_rng_state(ckpt["rng"])
+        start_step = ckpt["step"]
+        epoch, batch_in_epoch = ckpt["data"]["epoch"], ckpt["data"]["batch"]
+        print(f"resumed from {path} at step {start_step}")
+
+    def save_checkpoint(step):
+        kind, state = tokenizer_state(tok)
+        checkpointer.save({
+            "model": raw_model.state_dict(),
+            "tok": state,                   # 保存词表映射（bpe 为合并规则）
+            "tokenizer": kind,
+            "optimizer": opt.state_dict(),
+            "scaler": scaler.state_dict(),
+            "step": step,                   # 下一个要执行的优化步
+            "data": {"epoch": epoch, "batch": batch_in_epoch},  # 当前 epoch 已消费的 batch 数
+            "rng": capture_rng_state(),
+        }, step)
 
     model.train()
-    pbar = tqdm(range(cfg.max_steps), desc="training")
+    pbar = tqdm(range(start_step, cfg.max_steps), desc="training", initial=start_step, total=cfg.max_steps)
+    sampler.set_state(epoch, batch_in_epoch * cfg.batch_size)
     it = iter(dl)
+    loss_sum = torch.zeros((), device=device)  # 在设备上累计 loss，避免每步 .item() 同步
+    tokens_seen, t0 = 0, time.perf_counter()
     for step in pbar:
-        try:
-            x, y = next(it)
-        except StopIteration:
-            it = iter(dl)
-            x, y = next(it)
-
-        x, y = x.to(device), y.to(device)
-
-        with torch.cuda.amp.autocast(enabled=(device == "cuda")):
-            logits = model(x)
-            loss = torch.nn.functional.cross_entropy(logits.view(-1, cfg.vocab_size), y.view(-1))
-
-        scaler.scale(loss).backward()
-        torch.nn.utils.clip_grad_norm_(model.parameters(), 1.0)
+        for _ in range(cfg.grad_accum_steps):
+            try:
+                x, y = next(it)
+            except StopIteration:
+                epoch, batch_in_epoch = epoch + 1, 0
+                sampler.set_state(epoch)
+                it = iter(dl)
+                x, y = next(it)
+            batch_in_epoch += 1
+
+            x, y = x.to(device, non_blocking=True).long(), y.to(device, non_blocking=True).long()
+
+            with torch.autocast(device_type=device, dtype=amp_dtype, enabled=amp_enabled):
+                logits = model(x)
+                loss = torch.nn.functional.cross_entropy(logits.view(-1, cfg.vocab_size).float(), y.view(-1))
+
+            scaler.scale(loss / cfg.grad_accum_steps).backward()
+            loss_sum += loss.detach()
+            tokens_seen += y.numel()
+
+        scaler.unscale_(opt)
+        torch.nn.utils.clip_grad_norm_(raw_model.parameters(), 1.0)
         scaler.step(opt)
         scaler.update()
         opt.zero_grad(set_to_none=True)
 
-        pbar.set_postfix(loss=float(loss.item()))
+        if (step + 1) % cfg.log_interval == 0:
+            elapsed = time.perf_counter() - t0
+            avg_loss = loss_sum.item() / (cfg.log_interval * cfg.grad_accum_steps)
+            pbar.set_postfix(loss=f"{avg_loss:.4f}", tok_s=f"{tokens_seen / elapsed:.0f}")
+            loss_sum.zero_()
+            tokens_seen, t0 = 0, time.perf_counter()
 
-        if (step + 1) % 200 == 0:
-            torch.save({
-                "model": model.state_dict(),
-                "tok": tok.stoi,                # 保存词表映射
-            }, "ckpt.pt")
+        if (step + 1) % cfg.ckpt_interval == 0 or step + 1 == cfg.max_steps:
+            save_checkpoint(step + 1)
 
+    checkpointer.wait()
     print("done.")
 
 if __name__ == "__main__":
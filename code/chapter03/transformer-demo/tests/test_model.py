@@ -0,0 +1,98 @@
+import pytest
+import torch
+
+from model import KVCache, TransformerLM
+
+
+def _tiny_model(seed=0, attn_backend="auto", block_size=16):
+    torch.manual_seed(seed)
+    return TransformerLM(vocab_size=50, d_model=32, n_heads=4, d_ff=64, n_layers=2, block_size=block_size,
+                         dropout=0.0, attn_backend=attn_backend).eval()
+
+
+@pytest.mark.parametrize("attn_backend", ["manual", "sdpa"])
+def test_cached_forward_matches_full_forward(attn_backend):
+    model = _tiny_model(attn_backend=attn_backend)
+    x = torch.randint(0, 50, (2, 12))
+    cache = KVCache(len(model.blocks), model.block_size)
+
+    parts = [model(x[:, :5], kv_cache=cache)] + [model(x[:, t:t + 1], kv_cache=cache) for t in range(5, 12)]
+
+    torch.testing.assert_close(torch.cat(parts, dim=1), model(x), atol=1e-5, rtol=1e-5)
+
+
+def test_no_block_size_mask_in_state_dict_and_old_checkpoints_load():
+    model = _tiny_model()
+    state = model.state_dict()
+    assert "causal_mask" not in state
+
+    # 旧 checkpoint 中带有 (1, 1, block_size, block_size) 的 causal_mask
+    state["causal_mask"] = torch.ones(1, 1, model.block_size, model.block_size).tril()
+    _tiny_model(seed=1).load_state_dict(state)
+
+
+def test_cached_generation_matches_uncached_within_block_size():
+    model = _tiny_model()
+    prompt = torch.randint(0, 50, (2, 4))
+
+    torch.manual_seed(123)
+    cached = model.generate(prompt, max_new_tokens=model.block_size - 4, use_cache=True)
+    torch.manual_seed(123)
+    uncached = model.generate(prompt, max_new_tokens=model.block_size - 4, use_cache=False)
+
+    assert torch.equal(cached, uncached)
+
+
+def _greedy_reference(model, prompt, max_new_tokens):
+    idx = torch.tensor([prompt])
+    for _ in range(max_new_tokens):
+        next_id = model(idx[:, -model.block_size:])[:, -1].argmax(dim=-1, keepdim=True)
+        idx = torch.cat([idx, next_id], dim=1)
+    return idx[0].tolist()
+
+
+def test_greedy_batch_matches_single_sequence():
+    model = _tiny_model()
+    prompts = [[1, 2, 3, 4, 5, 6], [7], [8, 9, 10]]
+    budgets = [6, 10, 8]  # 均不超过 block_size
+
+    batch = model.generate_batch(prompts, max_new_tokens=budgets, top_k=1)
+
+    for prompt, budget, out in zip(prompts, budgets, batch):
+        assert out == model.generate_batch([prompt], max_new_tokens=budget, top_k=1)[0]
+        assert out == _greedy_reference(model, prompt, budget)
+
+
+@torch.no_grad()
+def _two_token_distribution(model, prompt):
+    """主模型逐 token 采样时，接下来两个 token 的精确联合分布，形状 (V, V)"""
+    idx = torch.tensor([prompt])
+    p1 = torch.softmax(model(idx)[0, -1], dim=-1)
+    vocab = p1.numel()
+    seconds = torch.cat([idx.expand(vocab, -1), torch.arange(vocab).unsqueeze(1)], dim=1)
+    p2 = torch.softmax(model(seconds)[:, -1], dim=-1)
+    return p1.unsqueeze(1) * p2
+
+
+def test_speculative_sampling_keeps_target_distribution():
+    vocab, prompt, n = 4, [0, 1, 2], 2000
+    torch.manual_seed(0)
+    target = TransformerLM(vocab, d_model=16, n_heads=2, d_ff=32, n_layers=1, block_size=16, dropout=0.0).eval()
+    torch.manual_seed(1)
+    draft = TransformerLM(vocab, d_model=16, n_heads=2, d_ff=32, n_layers=1, block_size=16, dropout=0.0).eval()
+
+    expected = _two_token_distribution(target, prompt)
+    # 两个模型的分布要明显不同，接受与残差重采样两条路径才都会被走到
+    assert 0.5 * (_two_token_distribution(draft, prompt) - expected).abs().sum() > 0.2
+
+    torch.manual_seed(2)
+    counts = torch.zeros(vocab, vocab)
+    accepted = 0
+    for _ in range(n):
+        out, stats = target.generate_speculative(torch.tensor([prompt]), draft, max_new_tokens=2, k=1)
+        counts[out[0, -2], out[0, -1]] += 1
+        accepted += stats["accepted"]
+
+    assert n // 10 < accepted < n - n // 10
+    total_variation = 0.5 * (counts / n - expected).abs().sum()
+    assert total_variation < 0.06
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# agents_demo 内部使用以本目录为根的绝对导入（from llm_client import ...）
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,67 @@
+import ast
+import json
+from typing import Any
+
+# Events returned by LiteralScanner.step
+OPEN = "open"
+CLOSE = "close"
+STRING_START = "string_start"
+STRING_END = "string_end"
+IN_STRING = "in_string"
+OTHER = "other"
+
+
+def parse_literal(text: str) -> Any:
+    """
+    Parse a JSON or Python literal without executing it.
+
+    JSON is tried first; ast.literal_eval covers Python-style output such as single-quoted strings
+    and trailing commas. Returns None if the text is not a valid literal.
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+class LiteralScanner:
+    """
+    Tracks string and bracket nesting of a JSON or Python literal one character at a time,
+    for parsers that need to find element boundaries in streamed model output.
+
+    Both double- and single-quoted strings are recognized, matching what parse_literal accepts,
+    and brackets inside strings are ignored.
+    """
+    def __init__(self):
+        self.depth = 0
+        self.quote = ""  # The quote character of the string being read, or "" outside strings
+        self._escape = False
+
+    def step(self, ch: str) -> str:
+        """
+        :param ch: The next character.
+        :return: One of OPEN, CLOSE, STRING_START, STRING_END, IN_STRING or OTHER.
+        """
+        if self.quote:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == self.quote:
+                self.quote = ""
+                return STRING_END
+            return IN_STRING
+        if ch in "\"'":
+            self.quote = ch
+            return STRING_START
+        if ch in "[{":
+            self.depth += 1
+            return OPEN
+        if ch in "]}":
+            self.depth -= 1
+            return CLOSE
+        return OTHER
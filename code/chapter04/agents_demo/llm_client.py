@@ -1,16 +1,54 @@
 import os
+import threading
 
+from dataclasses import dataclass
 from openai import OpenAI
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+from llm_cache import ResponseCache
 
 load_dotenv()
 
+@dataclass
+class UsageStats:
+    """
+    Token usage reported by the API. cached_prompt_tokens counts prompt tokens served from the
+    provider's prefix cache (OpenAI: prompt_tokens_details.cached_tokens, DeepSeek: prompt_cache_hit_tokens).
+    """
+    requests: int = 0
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @classmethod
+    def from_usage(cls, usage: Any) -> "UsageStats":
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or getattr(usage, "prompt_cache_hit_tokens", None) or 0
+        return cls(1, usage.prompt_tokens or 0, cached, usage.completion_tokens or 0)
+
+    def add(self, other: "UsageStats") -> None:
+        self.requests += other.requests
+        self.prompt_tokens += other.prompt_tokens
+        self.cached_prompt_tokens += other.cached_prompt_tokens
+        self.completion_tokens += other.completion_tokens
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cached_prompt_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
 class HelloAgentLLMClient:
     """
     LLM Client for interacting with the DeepSeek API.
+
+    One client may be shared by several threads (e.g. DagExecutor). The aggregate usage is
+    updated under a lock; per-call usage is handed back through the usage argument instead of
+    being stored on the client.
     """
-    def __init__(self, model: str = None, api_key: str = None, base_url: str = None, timeout: int = 60):
+    def __init__(self, model: str = None, api_key: str = None, base_url: str = None, timeout: int = 60, cache: Optional[ResponseCache] = None,
+                 include_usage: bool = True):
+        """
+        :param include_usage: Ask the API to append token usage to streamed responses (stream_options.include_usage).
+        """
         self.model = model or os.getenv("LLM_MODEL_ID")
         api_key = api_key or os.getenv("LLM_API_KEY")
         base_url = base_url or os.getenv("LLM_BASE_URL")
@@ -20,34 +58,98 @@ class HelloAgentLLMClient:
             raise ValueError("Model, API key, and Base URL must be provided either as arguments or environment variables.")
         
         self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout)
+        self.cache = cache
+        self.include_usage = include_usage
+        self.usage = UsageStats()
+        self._usage_lock = threading.Lock()
 
-    def think(self, messages: List[Dict[str, Any]], max_tokens: int = 512, temperature: float = 0.7) -> str:
+    def think(self, messages: List[Dict[str, Any]], max_tokens: int = 512, temperature: float = 0.7,
+              usage: Optional[UsageStats] = None) -> str:
         """
         Send a chat completion request to the LLM API.
 
         :param messages: List of message dicts with 'role' and 'content'.
         :param max_tokens: Maximum number of tokens to generate.
         :param temperature: Sampling temperature.(0: deterministic, 0.2-0.5: conservative, 0.7-1.0: creative, >1.0: very creative)
+        :param usage: If given, the token usage of this call is added to it (see think_stream).
         :return: The generated response from the model.
         """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(self.model, messages, temperature, max_tokens)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print ("Cache hit, replaying response:")
+                print(cached)
+                return cached
+
         print (f"Calling model: {self.model} with messages: {messages}")
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                stream=True, # Enable streaming responses
-            )
             # Collect the streamed response
             print ("Receiving streamed response:")
             collected_content = []
-            for chunk in response:
-                content = chunk.choices[0].delta.content or ''
+            for content in self.think_stream(messages, max_tokens, temperature, use_cache=False, usage=usage):
                 print(content, end='', flush=True)  # Print each chunk as it arrives
                 collected_content.append(content)
             print()  # New line after the complete response
-            return ''.join(collected_content)
+            result = ''.join(collected_content)
+            if cache_key is not None:
+                self.cache.set(cache_key, result)
+            return result
         except Exception as e:
             print(f"Error during LLM API call: {e}")
-            return "Error: Unable to get response from LLM."
\ No newline at end of file
+            return "Error: Unable to get response from LLM."
+
+    def think_stream(self, messages: List[Dict[str, Any]], max_tokens: int = 512, temperature: float = 0.7,
+                     use_cache: bool = True, usage: Optional[UsageStats] = None) -> Iterator[str]:
+        """
+        Stream a chat completion, yielding content chunks as they arrive.
+
+        Closing the generator early (break / close()) closes the HTTP stream, which stops
+        generation on the server side. Only fully consumed responses are written to the cache.
+
+        :param messages: List of message dicts with 'role' and 'content'.
+        :param max_tokens: Maximum number of tokens to generate.
+        :param temperature: Sampling temperature.
+        :param use_cache: Whether to read and write the response cache, if one is configured.
+        :param usage: If given, the token usage of this call is added to it when the provider reports it.
+                      It stays empty (requests == 0) for cache hits and streams closed before the usage chunk.
+        :return: Iterator over the generated text chunks.
+        """
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = self.cache.make_key(self.model, messages, temperature, max_tokens)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        extra = {"stream_options": {"include_usage": True}} if self.include_usage else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True, # Enable streaming responses
+            **extra,
+        )
+        collected_content = []
+        try:
+            for chunk in response:
+                # The usage chunk arrives last, so it is missing when the caller stops the stream early
+                if getattr(chunk, "usage", None):
+                    call_usage = UsageStats.from_usage(chunk.usage)
+                    if usage is not None:
+                        usage.add(call_usage)
+                    with self._usage_lock:
+                        self.usage.add(call_usage)
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    collected_content.append(content)
+                    yield content
+        finally:
+            response.close()
+        if cache_key is not None:
+            self.cache.set(cache_key, ''.join(collected_content))
\ No newline at end of file
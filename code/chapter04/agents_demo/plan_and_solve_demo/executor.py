@@ -11,8 +11,27 @@ EXECUTOR_PROMPT_TEMPLATE = """
 请仅输出针对当前步骤的最终答案。
 """
 
+DAG_STEP_PROMPT_TEMPLATE = """
+你是一位顶级的AI执行专家。你的任务是完成行动计划中的一个步骤。
+你将收到原始问题、当前步骤以及它所依赖的前置步骤的结果。
+请你专注于解决当前步骤，并仅输出该步骤的最终答案，不要输出任何额外的对话和解释。
+
+# 原始问题: {question}
+# 前置步骤与结果:
+{dependencies}
+# 当前步骤: {current_step}
+
+请仅输出针对当前步骤的最终答案。
+"""
+
+import queue
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
+
 from llm_client import HelloAgentLLMClient
+from plan_and_solve_demo.planner import PlanStep
 
 class Executor:
     def __init__(self, llm_client: HelloAgentLLMClient):
@@ -38,4 +57,96 @@ class Executor:
 
             print (f"step {i + 1} result: {response}")
 
-        return history[-1].split("结果: ")[1] if history else ""
\ No newline at end of file
+        return history[-1].split("结果: ")[1] if history else ""
+
+
+class DagExecutor:
+    """
+    Executes a dependency-annotated plan: every step runs exactly once, as soon as the
+    steps it depends on have finished. Independent steps run concurrently on a bounded
+    thread pool, and each step's prompt only contains the outputs of its own dependencies.
+    The plan may be a lazy iterator (e.g. Planner.stream_dag_plan), in which case steps are
+    dispatched while the rest of the plan is still being generated.
+    """
+    def __init__(self, llm_client: HelloAgentLLMClient, max_workers: int = 4):
+        """
+        :param llm_client: Client used to execute each step.
+        :param max_workers: Maximum number of steps executed at the same time.
+        """
+        self.llm_client = llm_client
+        self.max_workers = max_workers
+
+    def execute_step(self, question: str, step: PlanStep, results: Dict[int, str], plan: Dict[int, PlanStep]) -> str:
+        """
+        Execute a single step given the results of the steps it depends on.
+        """
+        dependencies = "\n".join(
+            f"步骤{dep}: {plan[dep].step}\n结果: {results[dep]}" for dep in step.depends_on
+        ) or "无"
+        prompt = DAG_STEP_PROMPT_TEMPLATE.format(
+            question=question,
+            dependencies=dependencies,
+            current_step=step.step
+        )
+        messages = [
+            {"role": "user", "content": prompt}
+        ]
+        return self.llm_client.think(messages)
+
+    def execute(self, question: str, steps: Iterable[PlanStep]) -> Dict[int, str]:
+        """
+        Run the whole plan.
+
+        :param question: The original user question.
+        :param steps: Plan steps, either a list or an iterator that yields them as they are planned;
+                      dependencies must refer to steps in the same plan.
+        :return: Mapping from step id to its result.
+        """
+        # Plan steps and step results both arrive as events, so a step becomes runnable as soon as
+        # it has been planned and its dependencies have finished, whichever happens last.
+        events: "queue.Queue[tuple]" = queue.Queue()
+
+        def _read_plan():
+            try:
+                for step in steps:
+                    events.put(("step", step))
+                events.put(("plan_done", None))
+            except Exception as e:
+                events.put(("plan_error", e))
+
+        threading.Thread(target=_read_plan, name="plan-reader", daemon=True).start()
+
+        plan: Dict[int, PlanStep] = {}
+        pending: Dict[int, set] = {}
+        results: Dict[int, str] = {}
+        running = 0
+        plan_done = False
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan-step") as pool:
+            while not plan_done or pending or running:
+                kind, payload = events.get()
+                if kind == "step":
+                    plan[payload.id] = payload
+                    pending[payload.id] = set(payload.depends_on)
+                elif kind == "result":
+                    step_id, future = payload
+                    running -= 1
+                    results[step_id] = future.result()
+                    print(f"step {step_id} result: {results[step_id]}")
+                elif kind == "plan_done":
+                    plan_done = True
+                else:
+                    raise payload
+
+                ready = [step_id for step_id, deps in pending.items() if deps <= results.keys()]
+                for step_id in ready:
+                    del pending[step_id]
+                    print(f"\n--- Executing Step {step_id}: {plan[step_id].step} ---")
+                    future = pool.submit(self.execute_step, question, plan[step_id], dict(results), dict(plan))
+                    future.add_done_callback(lambda f, step_id=step_id: events.put(("result", (step_id, f))))
+                    running += 1
+
+                if plan_done and pending and not running:
+                    raise ValueError(f"Unsatisfiable dependencies in plan: {pending}")
+
+        return results
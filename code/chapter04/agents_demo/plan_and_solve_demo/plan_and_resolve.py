@@ -1,13 +1,22 @@
 from llm_client import HelloAgentLLMClient
 from plan_and_solve_demo.planner import Planner
-from plan_and_solve_demo.executor import Executor
+from plan_and_solve_demo.executor import Executor, DagExecutor
 class PlanAndSolveAgent:
-    def __init__(self, llm_client: HelloAgentLLMClient):
+    def __init__(self, llm_client: HelloAgentLLMClient, parallel: bool = False, max_workers: int = 4):
+        """
+        :param llm_client: Client shared by the planner and the executor.
+        :param parallel: Plan with step dependencies and run independent steps concurrently.
+        :param max_workers: Maximum number of steps executed at the same time when parallel is set.
+        """
         self.llm_client = llm_client
+        self.parallel = parallel
         self.planner = Planner(llm_client)
         self.executor = Executor(llm_client)
+        self.dag_executor = DagExecutor(llm_client, max_workers=max_workers)
 
     def run(self, question: str) -> str:
+        if self.parallel:
+            return self.run_parallel(question)
         print("\n=== Planning Phase ===")
         plan = self.planner.create_plan(question)
         if not plan:
@@ -24,10 +33,25 @@ class PlanAndSolveAgent:
         print("\n最终答案:")
         print(final_answer)
         return final_answer
+
+    def run_parallel(self, question: str) -> str:
+        # Steps are streamed from the planner and dispatched as soon as they are parsed,
+        # so execution of the first steps overlaps with generation of the rest of the plan.
+        print("\n=== Planning & Execution Phase ===")
+        try:
+            results = self.dag_executor.execute(question, self.planner.stream_dag_plan(question))
+        except ValueError as e:
+            print(f"Error in plan: {e}")
+            return "无法生成有效的计划。"
+        final_answer = results[max(results)]
+
+        print("\n最终答案:")
+        print(final_answer)
+        return final_answer
     
 if __name__ == "__main__":
     llm_client = HelloAgentLLMClient()
-    agent = PlanAndSolveAgent(llm_client)
+    agent = PlanAndSolveAgent(llm_client, parallel=True)
 
     user_question = "一个水果店周一卖出了15个苹果。周二卖出的苹果数量是周一的两倍。周三卖出的数量比周二少了5个。请问这三天总共卖出了多少个苹果?"
     agent.run(user_question)
\ No newline at end of file
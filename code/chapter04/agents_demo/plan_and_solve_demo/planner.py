@@ -11,9 +11,87 @@ PLANNER_PROMPT_TEMPLATE = """
 ```
 """
 
+DAG_PLANNER_PROMPT_TEMPLATE = """
+你是一个顶级的AI规划专家。你的任务是将用户提出的复杂问题分解为一个由多个简单步骤组成的行动计划，
+并标注每个步骤依赖哪些前面步骤的结果。没有依赖关系的步骤可以同时执行。
+步骤编号从1开始连续递增，depends_on 只能引用编号更小的步骤，最后一个步骤必须给出问题的最终答案。
+
+问题: {question}
+
+请严格按照以下格式输出你的计划，```json与```作为前后缀是必要的:
+```json
+[
+  {{"id": 1, "step": "步骤1", "depends_on": []}},
+  {{"id": 2, "step": "步骤2", "depends_on": []}},
+  {{"id": 3, "step": "步骤3", "depends_on": [1, 2]}}
+]
+```
+"""
+
 import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List
 
 from llm_client import HelloAgentLLMClient
+from literal_parser import CLOSE, STRING_END, LiteralScanner, parse_literal
+
+@dataclass
+class PlanStep:
+    """
+    One step of a dependency-annotated plan.
+    """
+    id: int
+    step: str
+    depends_on: List[int] = field(default_factory=list)
+
+class StreamingPlanParser:
+    """
+    Incrementally parses a JSON array of plan items from streamed model output.
+
+    feed() returns the items completed by each new chunk, so step 1 can be dispatched while
+    the model is still generating later steps. Text before the first '[' (such as a ```json
+    fence) is ignored, and parsing stops at the matching ']'.
+    """
+    def __init__(self):
+        self.done = False
+        self._started = False
+        self._scanner = LiteralScanner()
+        self._element: List[str] = []
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        :param chunk: The next piece of streamed text.
+        :return: Array elements completed within this chunk, in order.
+        """
+        items = []
+        for ch in chunk:
+            if self.done:
+                break
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                    self._scanner.step(ch)
+                continue
+            in_string = bool(self._scanner.quote)
+            event = self._scanner.step(ch)
+            depth = self._scanner.depth
+            if event == CLOSE and depth == 0:
+                self.done = True
+                break
+            # Separators between top-level elements are dropped; everything inside an element is kept
+            if in_string or self._scanner.quote or depth > 1 or event == CLOSE:
+                self._element.append(ch)
+            if depth == 1 and event in (STRING_END, CLOSE):
+                items.append(self._emit())
+        return items
+
+    def _emit(self) -> Any:
+        text = "".join(self._element)
+        self._element = []
+        item = parse_literal(text)
+        if item is None:
+            raise ValueError(f"Malformed plan item: {text}")
+        return item
 
 class Planner:
     def __init__(self, llm_client: HelloAgentLLMClient):
@@ -34,17 +112,113 @@ class Planner:
         return plan
 
     def _extract_plan(self, response: str) -> list:
-        pattern = r"```python\s*(\[[\s\S]*?\])\s*```"
+        # Prefer the fenced block; fall back to the outermost [...] when the fence is missing
+        pattern = r"```(?:python|json)?\s*(\[[\s\S]*?\])\s*```"
+        match = re.search(pattern, response)
+        plan_str = match.group(1) if match else None
+        if plan_str is None:
+            match = re.search(r"\[[\s\S]*\]", response)
+            plan_str = match.group(0) if match else None
+
+        if plan_str is not None:
+            plan = parse_literal(plan_str)
+            if isinstance(plan, list) and all(isinstance(step, str) for step in plan):
+                return plan
+            print(f"Error parsing plan: not a list of strings: {plan_str}")
+
+        print("Failed to extract a valid plan from the response.")
+        return []
+
+    def create_dag_plan(self, question: str) -> List[PlanStep]:
+        """
+        Ask the LLM for a plan whose steps are annotated with their dependencies.
+
+        :param question: The user question to plan for.
+        :return: Steps in plan order, or an empty list if no valid plan was produced.
+        """
+        prompt = DAG_PLANNER_PROMPT_TEMPLATE.format(question=question)
+        messages = [
+            {"role": "user", "content": prompt}
+        ]
+        response = self.llm_client.think(messages)
+
+        if not response:
+            print("No response from LLM.")
+            return []
+
+        return self._extract_dag_plan(response)
+
+    def stream_dag_plan(self, question: str) -> Iterator[PlanStep]:
+        """
+        Like create_dag_plan, but yields each step as soon as the model has finished writing it,
+        so execution can start while the rest of the plan is still being generated.
+
+        :param question: The user question to plan for.
+        :return: Iterator over validated steps; raises ValueError on a malformed plan.
+        """
+        prompt = DAG_PLANNER_PROMPT_TEMPLATE.format(question=question)
+        messages = [
+            {"role": "user", "content": prompt}
+        ]
+        parser = StreamingPlanParser()
+        stream = self.llm_client.think_stream(messages)
+        expected_id = 1
+        try:
+            for chunk in stream:
+                for item in parser.feed(chunk):
+                    step = self._validate_step(item, expected_id)
+                    expected_id += 1
+                    print(f"Planned step {step.id}: {step.step} (depends on: {step.depends_on or 'none'})")
+                    yield step
+                if parser.done:
+                    break  # The plan array is closed; stop generation instead of waiting for trailing text
+        finally:
+            stream.close()
+        if expected_id == 1:
+            raise ValueError("Failed to extract a valid plan from the response.")
+
+    def _extract_dag_plan(self, response: str) -> List[PlanStep]:
+        pattern = r"```json\s*(\[[\s\S]*?\])\s*```"
         match = re.search(pattern, response)
 
         if match:
-            plan_str = match.group(1)
             try:
-                plan = eval(plan_str)
-                if isinstance(plan, list) and all(isinstance(step, str) for step in plan):
-                    return plan
-            except Exception as e:
-                print(f"Error evaluating plan: {e}")
+                return self._validate_dag_plan(parse_literal(match.group(1)))
+            except (ValueError, TypeError, KeyError) as e:
+                print(f"Error parsing plan: {e}")
 
         print("Failed to extract a valid plan from the response.")
-        return []
\ No newline at end of file
+        return []
+
+    @classmethod
+    def _validate_dag_plan(cls, items: list) -> List[PlanStep]:
+        """
+        Check ids are 1..n and every dependency points to an earlier step, which also rules out cycles.
+        """
+        if not isinstance(items, list):
+            raise ValueError("plan must be a list of steps")
+        return [cls._validate_step(item, expected_id) for expected_id, item in enumerate(items, start=1)]
+
+    @staticmethod
+    def _validate_step(item: Dict[str, Any], expected_id: int) -> PlanStep:
+        """
+        Validate one plan item against the {id, step, depends_on} schema.
+
+        Every schema violation is reported as ValueError, which is what callers catch.
+        """
+        if not isinstance(item, dict) or not isinstance(item.get("step"), str):
+            raise ValueError(f"plan item must be an object with a string 'step': {item}")
+        depends_on = item.get("depends_on", [])
+        if not isinstance(depends_on, list):
+            raise ValueError(f"'depends_on' must be a list: {item}")
+        try:
+            step = PlanStep(id=int(item["id"]), step=item["step"], depends_on=[int(dep) for dep in depends_on])
+        except KeyError:
+            raise ValueError(f"plan item is missing 'id': {item}") from None
+        except (TypeError, ValueError):
+            raise ValueError(f"'id' and 'depends_on' must be integers: {item}") from None
+        if step.id != expected_id:
+            raise ValueError(f"step ids must be consecutive from 1, got {step.id} at position {expected_id}")
+        if any(not 1 <= dep < step.id for dep in step.depends_on):
+            raise ValueError(f"step {step.id} depends on a step that does not precede it: {step.depends_on}")
+        return step
\ No newline at end of file
@@ -17,7 +17,9 @@ Action: 你决定采取的行动，必须是以下格式之一:
 Question: {question}
 History: {history}
 """
-REACT_PROMPT_TEMPLATE = """
+# System prompt: depends only on the tool list, so it is a stable prefix that provider-side
+# prompt caching can reuse across steps. The question and each step are appended as turns after it.
+REACT_SYSTEM_PROMPT_TEMPLATE = """
 你是一个可以使用工具的人工智能助理。你可以通过思考、行动和观察的循环来解决问题。
 
 以下是你可以使用的工具：
@@ -53,30 +55,59 @@ REACT_PROMPT_TEMPLATE = """
     }}
 }}
 
-现在，开始解决以下问题:
-Question: {question}
-History:{history}
+用户的问题以 Question 给出，每次工具调用的结果会以 Observation 的形式返回给你。
 """
 
 import re
 import json
+import time
 
-from llm_client import HelloAgentLLMClient
+from llm_client import HelloAgentLLMClient, UsageStats
 from react_demo.tool_executor import ToolExecutor
+from react_demo.action_parser import StreamingActionParser
+from literal_parser import parse_literal
 from react_demo.tools import search_google, calculator
 
 class ReActAgent:
-    def __init__(self, llm_client: HelloAgentLLMClient, tool_executor: ToolExecutor, max_steps: int = 5):
+    def __init__(self, llm_client: HelloAgentLLMClient, tool_executor: ToolExecutor, max_steps: int = 5, stream_actions: bool = True,
+                 drain_for_usage: bool = False):
+        """
+        :param stream_actions: Parse the response while it streams and stop generation as soon as
+                               a complete action has been emitted, instead of waiting for the full completion.
+        :param drain_for_usage: With stream_actions, leave the stream open once the action is complete and read
+                                the rest of it (without printing) after the tool has run, so the provider's usage
+                                chunk, which arrives last, is recorded in step_stats. The action never waits for it,
+                                but the tokens after the action are generated. Off by default: generation stops at
+                                the action and usage is not reported for steps that were cut short.
+        """
         self.llm_client = llm_client
         self.tool_executor = tool_executor
         self.max_steps = max_steps
+        self.stream_actions = stream_actions
+        self.drain_for_usage = drain_for_usage
+        # Conversation turns after the system prompt; only ever appended to, so every request
+        # shares the previous request's messages as its prefix.
         self.history = []
+        self.step_stats = []
+        self._system_prompt = None
+        self._system_prompt_tools = None
         self.error_count = 0
         self.correct_error_count = 3
         self.max_error = 3
+
+    def _get_system_prompt(self) -> str:
+        """
+        Build the system prompt once per tool list so it stays byte-identical between steps.
+        """
+        tools_description = self.tool_executor.get_available_tools()
+        if self._system_prompt is None or tools_description != self._system_prompt_tools:
+            self._system_prompt = REACT_SYSTEM_PROMPT_TEMPLATE.format(tools=tools_description)
+            self._system_prompt_tools = tools_description
+        return self._system_prompt
     
     def run(self, question: str) -> str:
-        self.history = []
+        self.history = [{"role": "user", "content": f"Question: {question}"}]
+        self.step_stats = []
         current_step = 0
 
         while current_step < self.max_steps:
@@ -84,88 +115,178 @@ class ReActAgent:
             print (f"\n--- Step {current_step} ---")
 
             tools_description = self.tool_executor.get_available_tools()
-            history_str = "\n".join(self.history)
-            prompt = REACT_PROMPT_TEMPLATE.format(
-                tools=tools_description,
-                question=question,
-                history=history_str
-            )
-
-            messages = [
-                {"role": "user", "content": prompt}
-            ]
-            response = self.llm_client.think(messages)
-
-            if not response:
-                print("No response from LLM. Exiting.")
-                break
-
-            thought, action, tool_name, tool_input, answer  = self._parse_response(response)
-
-            if thought:
-                print(f"Thought: {thought}")
-            # if not action:
-                # print("No action found in response. Exiting.")
-                # break
-
-            if action == "finish":
-            # if action.startswith("Finish["):
-                # final_answer = action[len("Finish["): -1]
-                print(f"Final Answer: {answer}")
-                return answer
-            if action == "tool":
-                if not tool_name or not tool_input:
-                    self.error_count += 1
-                    print("Invalid action format. Exiting.")
-                    break
+            messages = [{"role": "system", "content": self._get_system_prompt()}] + self.history
+            start = time.perf_counter()
+            usage = UsageStats()
+            remaining = None
+            if self.stream_actions:
+                response, parsed, remaining = self._think_until_action(messages, usage)
+            else:
+                response = self.llm_client.think(messages, usage=usage)
+                parsed = self._parse_response(response) if response else None
+            elapsed = time.perf_counter() - start
 
-                print(f"Action: {tool_name} with input: {tool_input}")
-                tool_func = self.tool_executor.get_tool(tool_name)
-                if not tool_func:
-                    self.error_count += 1
-                    print(f"Tool '{tool_name}' not found. Exiting.")
+            try:
+                if not parsed:
+                    print("No response from LLM. Exiting.")
                     break
-                observation = tool_func(tool_input)
-                print(f"Observation: {observation}")
 
-            if self.error_count >= self.correct_error_count and self.error_count < self.max_error:
-                self.history.append(f"Obeservation: 你多次调用了不存在的工具或者调用工具时输入了错误的参数。请注意：\n- 可用的工具有{tools_description}\n- 输入的参数请根据之前提示词中要求输入")
-            if self.error_count >= self.max_error:
-                return f"多次错误调用工具，结束本次对话"
-            self.history.append(f"action: {action}\n")
-            self.history.append(f"Observation: {observation}\n")
+                thought, action, tool_name, tool_input, answer  = parsed
+                self.history.append({"role": "assistant", "content": response.strip()})
+
+                if thought:
+                    print(f"Thought: {thought}")
+                # if not action:
+                    # print("No action found in response. Exiting.")
+                    # break
+
+                if action == "finish":
+                # if action.startswith("Finish["):
+                    # final_answer = action[len("Finish["): -1]
+                    print(f"Final Answer: {answer}")
+                    return answer
+                if action == "tool":
+                    if not tool_name or not tool_input:
+                        self.error_count += 1
+                        print("Invalid action format. Exiting.")
+                        break
+
+                    print(f"Action: {tool_name} with input: {tool_input}")
+                    tool_func = self.tool_executor.get_tool(tool_name)
+                    if not tool_func:
+                        self.error_count += 1
+                        print(f"Tool '{tool_name}' not found. Exiting.")
+                        break
+                    observation = tool_func(tool_input)
+                    print(f"Observation: {observation}")
+                else:
+                    self.error_count += 1
+                    observation = "未能解析出有效的 Action，请严格按照要求的格式输出。"
+                    print(f"Unrecognized action: {action!r}")
+
+                if self.error_count >= self.correct_error_count and self.error_count < self.max_error:
+                    self.history.append({"role": "user", "content": f"Obeservation: 你多次调用了不存在的工具或者调用工具时输入了错误的参数。请注意：\n- 可用的工具有{tools_description}\n- 输入的参数请根据之前提示词中要求输入"})
+                if self.error_count >= self.max_error:
+                    return f"多次错误调用工具，结束本次对话"
+                self.history.append({"role": "user", "content": f"Observation: {observation}"})
+            finally:
+                # The action has already been dispatched; only now read the rest of the stream for its usage
+                self._drain(remaining)
+                self._record_step(current_step, elapsed, usage)
 
         print("Max steps reached without finding a final answer.")
         return None
             
 
+    def _record_step(self, step: int, elapsed: float, usage: UsageStats) -> None:
+        """
+        Record latency and token usage of one LLM call. elapsed is measured up to the parsed action.
+        Usage is only available when the provider reports it and the stream was read to the end
+        (see drain_for_usage).
+        """
+        stats = {"step": step, "elapsed": elapsed}
+        if not usage.requests:
+            print(f"[step {step}: {elapsed:.2f}s, usage not reported]")
+        else:
+            stats.update(prompt_tokens=usage.prompt_tokens, cached_prompt_tokens=usage.cached_prompt_tokens,
+                         completion_tokens=usage.completion_tokens)
+            print(f"[step {step}: {elapsed:.2f}s, prompt {usage.prompt_tokens} tokens "
+                  f"({usage.cached_prompt_tokens} cached), completion {usage.completion_tokens} tokens]")
+        self.step_stats.append(stats)
+
+    def _think_until_action(self, messages: list, usage: UsageStats):
+        """
+        Stream the completion and return as soon as a complete action has been parsed.
+        Closing the stream stops generation, so tokens the model would write after the
+        action (for example a hallucinated observation) are neither generated nor waited for.
+        With drain_for_usage the stream is instead returned still open, for _drain to finish
+        after the action has been dispatched.
+        Falls back to _parse_response on the full text if no action is detected.
+
+        :return: (response text received so far, parsed fields or None, unread stream or None)
+        """
+        parser = StreamingActionParser()
+        stream = self.llm_client.think_stream(messages, usage=usage)
+        remaining = None
+        try:
+            for chunk in stream:
+                print(chunk, end='', flush=True)
+                if parser.feed(chunk):
+                    if self.drain_for_usage and getattr(self.llm_client, "include_usage", False):
+                        print("\n[action complete, rest of the stream is read after the action]")
+                        remaining = stream
+                    else:
+                        print("\n[action complete, generation stopped]")
+                    break
+            else:
+                print()
+        except Exception as e:
+            print(f"Error during LLM API call: {e}")
+            return "", None, None
+        finally:
+            if remaining is None:
+                stream.close()
+
+        response = parser.text
+        if not parser.done:
+            return response, self._parse_response(response) if response else None, None
+        # The stream was cut right after the action, so store a well-formed copy of the turn
+        # in the history instead of the truncated text
+        response = json.dumps({"thought": parser.thought, "action": parser.action}, ensure_ascii=False)
+        return response, (parser.thought, *self._action_fields(parser.action)), remaining
+
+    @staticmethod
+    def _drain(stream) -> None:
+        """
+        Read and discard the rest of a stream left open by _think_until_action, so its usage is recorded.
+        """
+        if stream is None:
+            return
+        try:
+            for _ in stream:
+                pass
+        except Exception as e:
+            print(f"Error while reading usage from the stream: {e}")
+        finally:
+            stream.close()
+
+    @staticmethod
+    def _action_fields(action_dict: dict):
+        """
+        Extract (action, tool_name, tool_input, answer) from a parsed action object.
+        """
+        return (
+            action_dict.get("type", ""),
+            action_dict.get("name", ""),
+            action_dict.get("input", ""),
+            action_dict.get("answer", ""),
+        )
+
     def _parse_response(self, response: str):
         """
-        - 优先尝试解析为 JSON
+        - 优先尝试解析为 JSON（兼容单引号等 Python 字面量写法，以及 JSON 前后多余的文字）
         - 如果失败，尝试简单的字符串兜底
         - 保证返回 thought, action, tool_name, tool_input, answer 五个字段
         """
         thought, action, tool_name, tool_input, answer = "", "", "", "", ""
 
-        try:
-            # 尝试解析 JSON
-            response_dict = json.loads(response)
+        response_dict = parse_literal(response.strip())
+        if not isinstance(response_dict, dict):
+            match = re.search(r"\{[\s\S]*\}", response)
+            response_dict = parse_literal(match.group(0)) if match else None
 
+        if isinstance(response_dict, dict):
             # 安全获取字段，避免 KeyError
             thought = response_dict.get("thought", "")
             action_dict = response_dict.get("action", {})
 
             if isinstance(action_dict, dict):
-                action = action_dict.get("type", "")
-                tool_name = action_dict.get("name", "")
-                tool_input = action_dict.get("input", "")
-                answer = action_dict.get("answer", "")
+                action, tool_name, tool_input, answer = self._action_fields(action_dict)
             else:
                 # 如果 action 不是 dict，兜底处理
                 action = str(action_dict)
-
-        except json.JSONDecodeError as e:
-            print(f"JSON解析失败: {e}")
+        else:
+            print("JSON解析失败，按文本格式解析")
             # 兜底：尝试简单字符串解析
             if "Thought:" in response:
                 thought = response.split("Thought:")[-1].split("Action:")[0].strip()
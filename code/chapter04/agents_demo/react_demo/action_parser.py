@@ -0,0 +1,103 @@
+import re
+from typing import Any, Dict, Optional
+
+from literal_parser import CLOSE, OTHER, STRING_END, STRING_START, LiteralScanner, parse_literal
+
+TEXT_ACTION_PATTERN = re.compile(r"Action:\s*(\w+)\[(.*?)\]\s*\n")
+
+
+class StreamingActionParser:
+    """
+    Incrementally parses a ReAct response while it is being streamed, so the agent can
+    dispatch the action as soon as it is complete instead of waiting for the full completion.
+
+    Two response formats are recognized:
+    - JSON: {"thought": "...", "action": {...}}. The action is complete when the closing brace
+      of the "action" object arrives; anything the model writes afterwards is not needed.
+    - Text: "Thought: ...\nAction: tool_name[tool_input]" (also Finish[answer]), complete at the
+      end of the Action line. Brackets inside the Thought do not affect this format.
+    """
+    def __init__(self):
+        self.thought = ""
+        self.action: Optional[Dict[str, Any]] = None
+        self._text = ""
+        self._pos = 0
+        self._scanner = LiteralScanner()
+        self._string_start = 0
+        self._last_string = None
+        self._key = None
+        self._action_start = None
+        self._json_format: Optional[bool] = None  # Decided by the first non-blank character
+
+    @property
+    def done(self) -> bool:
+        return self.action is not None
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """
+        :param chunk: The next piece of streamed text.
+        :return: The action dict once it is complete, otherwise None.
+        """
+        if self.done:
+            return self.action
+        self._text += chunk
+        text = self._text
+        for i in range(self._pos, len(text)):
+            self._step(text, i)
+            if self.done:
+                break
+        self._pos = len(text)
+        if self._json_format is None and text.strip():
+            self._json_format = text.lstrip()[0] in "{`"
+        if not self.done and self._json_format is False:
+            self._match_text_action(text)
+        return self.action
+
+    def _step(self, text: str, i: int) -> None:
+        ch = text[i]
+        scanner = self._scanner
+        if scanner.depth == 0 and ch not in "{[":
+            return  # Text outside the JSON object (or a text-format response)
+        if ch == "{" and not scanner.quote and scanner.depth == 1 and self._key == "action":
+            self._action_start = i
+
+        event = scanner.step(ch)
+        if event == STRING_START:
+            self._string_start = i
+        elif event == STRING_END:
+            if scanner.depth == 1:
+                self._on_top_level_string(text[self._string_start:i + 1])
+        elif event == CLOSE:
+            if scanner.depth == 1 and self._action_start is not None:
+                action = parse_literal(text[self._action_start:i + 1])
+                self._action_start = None
+                if isinstance(action, dict):
+                    self.action = action
+        elif event == OTHER and scanner.depth == 1:
+            if ch == ":" and self._last_string is not None:
+                self._key, self._last_string = self._last_string, None
+            elif ch == ",":
+                self._key = None
+
+    def _on_top_level_string(self, literal: str) -> None:
+        value = parse_literal(literal)
+        if self._key is None:
+            self._last_string = value
+        elif self._key == "thought" and isinstance(value, str):
+            self.thought = value
+
+    def _match_text_action(self, text: str) -> None:
+        match = TEXT_ACTION_PATTERN.search(text)
+        if not match:
+            return
+        if "Thought:" in text:
+            self.thought = text.split("Thought:")[-1].split("Action:")[0].strip()
+        name, argument = match.group(1), match.group(2)
+        if name.lower() == "finish":
+            self.action = {"type": "finish", "answer": argument}
+        else:
+            self.action = {"type": "tool", "name": name, "input": argument}
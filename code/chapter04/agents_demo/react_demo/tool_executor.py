@@ -1,8 +1,9 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 class ToolExecutor:
     def __init__(self, tools: Dict[str, Dict[str, Any]]):
         self.tools: Dict[str, Dict[str, Any]] = {}
+        self._description: Optional[str] = None  # memoized get_available_tools() output
 
     def register_tool(self, name: str, func: Any, description: str) -> None:
         if name in self.tools:
@@ -11,6 +12,7 @@ class ToolExecutor:
             "function": func,
             "description": description
         }
+        self._description = None
         print(f"Registered tool: {name} successfully.")
 
     def get_tool(self, name: str) -> callable:
@@ -19,5 +21,8 @@ class ToolExecutor:
         return self.tools[name]["function"]
     
     def get_available_tools(self) -> str:
-        tool_list = [f"{name}: {info['description']}" for name, info in self.tools.items()]
-        return "\n".join(tool_list)
\ No newline at end of file
+        # Memoized so the prompt prefix built from it stays byte-identical between steps
+        if self._description is None:
+            tool_list = [f"{name}: {info['description']}" for name, info in self.tools.items()]
+            self._description = "\n".join(tool_list)
+        return self._description
\ No newline at end of file
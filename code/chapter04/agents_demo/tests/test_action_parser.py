@@ -0,0 +1,66 @@
+from react_demo.ReAct import ReActAgent
+from react_demo.action_parser import StreamingActionParser
+from react_demo.tool_executor import ToolExecutor
+
+
+def _feed_all(text: str, chunk_size: int = 3):
+    parser = StreamingActionParser()
+    for i in range(0, len(text), chunk_size):
+        if parser.feed(text[i:i + chunk_size]):
+            break
+    return parser
+
+
+def test_detects_python_style_single_quoted_action():
+    text = "{'thought': \"it's [easy] {x}\", 'action': {'type': 'tool', 'name': 'Calculator', 'input': '1+2'}} trailing"
+    parser = _feed_all(text)
+
+    assert parser.action == {"type": "tool", "name": "Calculator", "input": "1+2"}
+    assert parser.thought == "it's [easy] {x}"
+    assert "trailing" not in parser.text
+
+
+def test_text_action_detected_despite_stray_bracket_in_thought():
+    text = "Thought: 先算 [1+2 的结果，还有 {\nAction: Calculator[1+2]\nObservation: 3\n"
+    parser = _feed_all(text)
+
+    assert parser.action == {"type": "tool", "name": "Calculator", "input": "1+2"}
+    assert parser.thought.startswith("先算")
+
+
+def test_text_is_kept_as_running_string():
+    parser = StreamingActionParser()
+    for chunk in ["Thought: a", "b\n", "Action: Finish[4", "2]\n"]:
+        parser.feed(chunk)
+
+    assert parser.text == "Thought: ab\nAction: Finish[42]\n"
+    assert parser.action == {"type": "finish", "answer": "42"}
+
+
+class FakeLLMClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def think(self, messages, **kwargs):
+        return self.responses.pop(0)
+
+
+def test_react_run_accepts_single_quoted_json_without_streaming():
+    tools = ToolExecutor(tools={})
+    tools.register_tool("Calculator", lambda expr: "3", "计算器")
+    llm = FakeLLMClient([
+        "{'thought': '先计算', 'action': {'type': 'tool', 'name': 'Calculator', 'input': '1+2'}}\n多余的文字",
+        '{"thought": "得到结果", "action": {"type": "finish", "answer": "3"}}',
+    ])
+    agent = ReActAgent(llm, tools, stream_actions=False)
+
+    assert agent.run("1+2=?") == "3"
+    assert agent.history[2] == {"role": "user", "content": "Observation: 3"}
+
+
+def test_react_run_survives_unrecognized_action():
+    llm = FakeLLMClient(["我不知道该怎么做"] * 2)
+    agent = ReActAgent(llm, ToolExecutor(tools={}), max_steps=2, stream_actions=False)
+
+    assert agent.run("?") is None
+    assert agent.error_count == 2
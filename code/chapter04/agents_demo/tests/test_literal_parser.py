@@ -0,0 +1,16 @@
+from literal_parser import CLOSE, STRING_END, LiteralScanner, parse_literal
+
+
+def test_parse_literal_accepts_json_and_python_literals():
+    assert parse_literal('{"a": [1, 2]}') == {"a": [1, 2]}
+    assert parse_literal("{'a': (1, 2),}") == {"a": (1, 2)}
+    assert parse_literal("__import__('os')") is None
+
+
+def test_scanner_ignores_brackets_and_escaped_quotes_in_strings():
+    scanner = LiteralScanner()
+    events = [scanner.step(ch) for ch in r"""['a]\'', "}"]"""]
+
+    assert events.count(STRING_END) == 2
+    assert events[-1] == CLOSE
+    assert scanner.depth == 0 and scanner.quote == ""
@@ -0,0 +1,46 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from llm_client import HelloAgentLLMClient, UsageStats
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+
+    def __iter__(self):
+        for ch in self.text:
+            time.sleep(0.001)  # Let calls from other threads interleave
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=ch))], usage=None)
+        usage = SimpleNamespace(prompt_tokens=self.prompt_tokens, completion_tokens=len(self.text),
+                                prompt_tokens_details=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    def close(self):
+        pass
+
+
+class FakeCompletions:
+    def create(self, messages, **kwargs):
+        # The prompt token count encodes which call this is, so usage can be matched to its caller
+        return FakeResponse("ok", int(messages[-1]["content"]))
+
+
+def test_concurrent_calls_get_their_own_usage():
+    llm = HelloAgentLLMClient(model="test-model", api_key="sk-test", base_url="http://localhost:9/v1")
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+
+    def _call(n):
+        usage = UsageStats()
+        "".join(llm.think_stream([{"role": "user", "content": str(n)}], usage=usage))
+        return n, usage
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(_call, range(1, 41)))
+
+    assert all(usage.prompt_tokens == n and usage.requests == 1 for n, usage in results)
+    assert llm.usage.requests == 40
+    assert llm.usage.prompt_tokens == sum(range(1, 41))
+    assert llm.usage.completion_tokens == 80
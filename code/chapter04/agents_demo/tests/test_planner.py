@@ -0,0 +1,65 @@
+import pytest
+
+from plan_and_solve_demo.plan_and_resolve import PlanAndSolveAgent
+from plan_and_solve_demo.planner import Planner, StreamingPlanParser
+
+
+class FakeLLMClient:
+    """Streams a canned plan in small chunks and answers every executor step with its prompt length."""
+
+    def __init__(self, plan_text: str, chunk_size: int = 7):
+        self.plan_text = plan_text
+        self.chunk_size = chunk_size
+
+    def think_stream(self, messages, **kwargs):
+        for i in range(0, len(self.plan_text), self.chunk_size):
+            yield self.plan_text[i:i + self.chunk_size]
+
+    def think(self, messages, **kwargs):
+        return f"answer-{len(messages[-1]['content'])}"
+
+
+def _feed_all(text: str, chunk_size: int = 5):
+    parser = StreamingPlanParser()
+    items = []
+    for i in range(0, len(text), chunk_size):
+        items.extend(parser.feed(text[i:i + chunk_size]))
+    return parser, items
+
+
+def test_streaming_parser_handles_python_literal_plans():
+    text = """```python
+[{'id': 1, 'step': "计算周二的数量 [2x]", 'depends_on': []},
+ {'id': 2, 'step': 'say "hi" {ok}', 'depends_on': [1]}]
+```"""
+    parser, items = _feed_all(text)
+
+    assert parser.done
+    assert items == [
+        {"id": 1, "step": "计算周二的数量 [2x]", "depends_on": []},
+        {"id": 2, "step": 'say "hi" {ok}', "depends_on": [1]},
+    ]
+
+
+@pytest.mark.parametrize("item", [
+    {"step": "missing id"},
+    {"id": 1, "step": "null dep", "depends_on": [None]},
+    {"id": "one", "step": "bad id"},
+])
+def test_validate_step_reports_value_error(item):
+    with pytest.raises(ValueError):
+        Planner._validate_step(item, 1)
+
+
+def test_run_parallel_survives_malformed_plan():
+    plan = '```json\n[{"id": 1, "step": "a", "depends_on": []}, {"id": 2, "step": "b", "depends_on": [null]}]\n```'
+    agent = PlanAndSolveAgent(FakeLLMClient(plan), parallel=True)
+
+    assert agent.run("问题") == "无法生成有效的计划。"
+
+
+def test_run_parallel_executes_streamed_plan():
+    plan = '```json\n[{"id": 1, "step": "a", "depends_on": []}, {"id": 2, "step": "b", "depends_on": [1]}]\n```'
+    agent = PlanAndSolveAgent(FakeLLMClient(plan), parallel=True)
+
+    assert agent.run("问题").startswith("answer-")
@@ -0,0 +1,56 @@
+from llm_client import UsageStats
+from react_demo.ReAct import ReActAgent
+from react_demo.tool_executor import ToolExecutor
+
+RESPONSES = [
+    '{"thought": "先查一下", "action": {"type": "tool", "name": "Lookup", "input": "q"}}\nObservation: 编造的结果',
+    '{"thought": "直接回答", "action": {"type": "finish", "answer": "42"}}\nObservation: 多余的内容',
+]
+
+
+class FakeStreamingClient:
+    """Streams canned responses and, like HelloAgentLLMClient, reports usage only when a stream is read to the end."""
+
+    include_usage = True
+
+    def __init__(self, events):
+        self.responses = list(RESPONSES)
+        self.events = events
+
+    def think_stream(self, messages, usage=None, **kwargs):
+        text = self.responses.pop(0)
+        finished = False
+        try:
+            for i in range(0, len(text), 8):
+                yield text[i:i + 8]
+            finished = True
+            if usage is not None:
+                usage.add(UsageStats(requests=1, prompt_tokens=100, cached_prompt_tokens=64, completion_tokens=20))
+        finally:
+            self.events.append("stream finished" if finished else "stream closed early")
+
+
+def _make_agent(events, **kwargs):
+    tools = ToolExecutor(tools={})
+    tools.register_tool("Lookup", lambda query: events.append("tool") or "结果", "查询")
+    return ReActAgent(FakeStreamingClient(events), tools, **kwargs)
+
+
+def test_streamed_steps_stop_generation_by_default():
+    events = []
+    agent = _make_agent(events)
+
+    assert agent.run("问题") == "42"
+    assert events == ["stream closed early", "tool", "stream closed early"]
+    assert all("prompt_tokens" not in stats for stats in agent.step_stats)
+
+
+def test_drain_for_usage_reads_the_stream_after_the_tool_runs():
+    events = []
+    agent = _make_agent(events, drain_for_usage=True)
+
+    assert agent.run("问题") == "42"
+    # The action is dispatched before the rest of the stream is read
+    assert events == ["tool", "stream finished", "stream finished"]
+    assert [stats["prompt_tokens"] for stats in agent.step_stats] == [100, 100]
+    assert agent.step_stats[0]["cached_prompt_tokens"] == 64
@@ -1,4 +1,7 @@
-from typing import Optional, Iterator, TYPE_CHECKING
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Iterator, Literal, Any, TYPE_CHECKING
 from core.llm import HelloAgentsLLM
 from core.agent import Agent
 from core.message import Message
@@ -10,6 +13,11 @@ if TYPE_CHECKING:
 class SimpleAgent(Agent):
     """
     简单对话agent
+
+    支持两种工具调用模式：
+    - text：在系统提示词中注入工具说明，由模型输出 `[TOOL_CALL:tool_name:parameters]` 文本再解析
+    - native：通过提供商原生的 tools 参数传递工具 schema，直接读取结构化的 tool_calls，
+      提示词更短，且一轮响应中的多个工具调用会并行执行
     """
     def __init__(
         self,
@@ -19,15 +27,24 @@ class SimpleAgent(Agent):
         config: Optional[Config] = None,
         tool_register: Optional['ToolRegistry'] = None,
         enable_tools_calling: bool = False,
+        tool_calling_mode: Literal["text", "native"] = "text",
+        max_tool_iterations: int = 3,
     ):
         super().__init__(name, llm, system_prompt, config)
         self.tool_register = tool_register
         self.enable_tools_calling = enable_tools_calling
+        self.tool_calling_mode = tool_calling_mode
+        self.max_tool_iterations = max_tool_iterations
+        self._prompt_cache: Optional[tuple] = None  # (system_prompt, 工具注册表id, 工具注册表version, 增强后的提示词)
 
     def _get_enhanced_system_prompt(self) -> str:
         base_prompt = self.system_prompt or "你是一个有用的AI助手。"
-        if not self.enable_tools_calling or not self.tool_register:
+        if not self.enable_tools_calling or not self.tool_register or self.tool_calling_mode == "native":
             return base_prompt
+
+        cache_key = (base_prompt, id(self.tool_register), self.tool_register.version)
+        if self._prompt_cache is not None and self._prompt_cache[:3] == cache_key:
+            return self._prompt_cache[3]
         
         tools_description = self.tool_register.get_tools_description()
         if not tools_description or tools_description == "暂无可用工具。":
@@ -52,8 +69,94 @@ class SimpleAgent(Agent):
         tools_prompt += "- 文件路径等字符串参数直接写：`path=README.md`\n"
         tools_prompt += "- 工具调用结果会自动插入到对话中，然后你可以基于结果继续回答\n"
 
-        return base_prompt +"\n" + tools_prompt
+        self._prompt_cache = (*cache_key, base_prompt +"\n" + tools_prompt)
+        return self._prompt_cache[3]
     
+    def run(self, input_text: str, **kwargs) -> str:
+        """
+        运行智能体：根据工具调用模式与模型交互，必要时调用工具，返回最终回答。
+        """
+        messages: list[dict[str, Any]] = [{"role": "system", "content": self._get_enhanced_system_prompt()}]
+        messages.extend({"role": m.role, "content": m.content} for m in self.get_history_view())
+        messages.append({"role": "user", "content": input_text})
+
+        if self.enable_tools_calling and self.tool_register and self.tool_calling_mode == "native":
+            response = self._run_with_native_tools(messages, **kwargs)
+        elif self.enable_tools_calling and self.tool_register:
+            response = self._run_with_text_tools(messages, **kwargs)
+        else:
+            response = self.llm.invoke(messages, **kwargs)
+
+        self.add_message_to_history(Message(input_text, "user"))
+        self.add_message_to_history(Message(response, "assistant"))
+        return response
+
+    def _run_with_text_tools(self, messages: list[dict[str, Any]], **kwargs) -> str:
+        """
+        文本模式：解析模型输出中的 `[TOOL_CALL:...]` 标记并执行工具，直到模型不再调用工具。
+        """
+        pattern = r"\[TOOL_CALL:([^:\]]+):([^\]]*)\]"
+        response = ""
+        for _ in range(self.max_tool_iterations + 1):
+            response = self.llm.invoke(messages, **kwargs)
+            tool_calls = re.findall(pattern, response)
+            if not tool_calls:
+                return response
+
+            results = [self._execute_tool_call(name.strip(), params.strip()) for name, params in tool_calls]
+            messages.append({"role": "assistant", "content": response})
+            messages.append({"role": "user", "content": "工具执行结果：\n" + "\n\n".join(results) + "\n\n请基于这些结果继续回答。"})
+        return re.sub(pattern, "", response).strip()
+
+    def _run_with_native_tools(self, messages: list[dict[str, Any]], **kwargs) -> str:
+        """
+        原生模式：通过 tools 参数发送工具 schema，读取结构化 tool_calls，并行执行同一轮中的多个工具调用。
+        """
+        tools = self.tool_register.get_openai_tools()
+        for _ in range(self.max_tool_iterations):
+            message = self.llm.invoke_with_tools(messages, tools, **kwargs)
+            if not message.tool_calls:
+                return message.content or ""
+
+            messages.append({
+                "role": "assistant",
+                "content": message.content or "",
+                "tool_calls": [tool_call.model_dump() for tool_call in message.tool_calls],
+            })
+            with ThreadPoolExecutor(max_workers=len(message.tool_calls)) as executor:
+                results = list(executor.map(
+                    lambda tc: self._execute_native_tool_call(tc.function.name, tc.function.arguments),
+                    message.tool_calls,
+                ))
+            for tool_call, result in zip(message.tool_calls, results):
+                messages.append({"role": "tool", "tool_call_id": tool_call.id, "content": result})
+
+        # 达到最大迭代次数，要求模型基于已有结果直接作答
+        return self.llm.invoke(messages, **kwargs)
+
+    def _execute_native_tool_call(self, tool_name: str, arguments: str) -> str:
+        """执行原生 tool_calls 中的单个工具调用
+
+        Args:
+            tool_name (str): 工具名称
+            arguments (str): JSON 格式的参数字符串
+
+        Returns:
+            str: 调用结果
+        """
+        try:
+            params_dict = json.loads(arguments) if arguments else {}
+        except json.JSONDecodeError as e:
+            return f"错误：工具'{tool_name}'的参数不是合法的JSON：{str(e)}"
+
+        tool = self.tool_register.get_tool(tool_name)
+        if tool is not None:
+            try:
+                return str(tool.run(self._convert_param_types(tool_name, params_dict)))
+            except Exception as e:
+                return f"错误：调用工具'{tool_name}'时发生异常：{str(e)}"
+        return self.tool_register.execute_tool(tool_name, str(params_dict.get("input", "")))
+
     def _execute_tool_call(self, tool_name: str, parameters: str) -> str:
         """执行工具调用
 
@@ -70,8 +173,13 @@ class SimpleAgent(Agent):
         try:
             tool = self.tool_register.get_tool(tool_name)
             if not tool:
-                return f"错误：未找到名为'{tool_name}'的工具。"
-            
+                if self.tool_register.get_function(tool_name) is None:
+                    return f"错误：未找到名为'{tool_name}'的工具。"
+                # 通过 register_function 注册的函数只接收一段输入文本
+                params_dict = self._parse_tool_parameters(tool_name, parameters)
+                result = self.tool_register.execute_tool(tool_name, str(params_dict.get("input", parameters)))
+                return f"工具'{tool_name}'调用结果：\n{result}"
+
             params_dict = self._parse_tool_parameters(tool_name, parameters)
 
             result = tool.run(params_dict)
@@ -90,7 +198,6 @@ class SimpleAgent(Agent):
         Returns:
             dict: 参数字典
         """
-        import json
         params_dict = {}
 
         if parameters.strip().startswith("{") and parameters.strip().endswith("}"):
@@ -113,13 +220,24 @@ class SimpleAgent(Agent):
                 params_dict[key.strip()] = value.strip()
             
             params_dict = self._convert_param_types(tool_name, params_dict)
-
-            if 'action' not in params_dict:
-                params_dict = self._infer_simple_parameters(tool_name, parameters)
         else:
             params_dict = self._infer_simple_parameters(tool_name, parameters)
 
         return params_dict
+
+    def _infer_simple_parameters(self, tool_name: str, parameters: str) -> dict:
+        """把不含 key=value 的纯文本参数（如 `[TOOL_CALL:search:Python编程]`）映射为参数字典
+
+        Args:
+            tool_name (str): 工具名称
+            parameters (str): 参数字符串
+
+        Returns:
+            dict: 以工具的第一个参数为键的参数字典；工具没有参数定义（如函数工具）时使用 input
+        """
+        param_types = self.tool_register.get_param_types(tool_name) if self.tool_register else {}
+        key = next(iter(param_types), "input")
+        return self._convert_param_types(tool_name, {key: parameters.strip()})
     
     def _convert_param_types(self, tool_name: str, params_dict: dict) -> dict:
         """
@@ -134,19 +252,13 @@ class SimpleAgent(Agent):
         if not self.tool_register:
             return params_dict
         
-        tool = self.tool_register.get_tool(tool_name)
-        if not tool:
-            return params_dict
-        
         try:
-            tool_params = tool.get_parameters()
+            param_types = self.tool_register.get_param_types(tool_name)
         except Exception:
             return params_dict
-        
-        param_types = {}
-        for param in tool_params:
-            param_types[param.name] = param.type
-            
+        if not param_types:
+            return params_dict
+
         converted_dict = {}
         for key, value in params_dict.items():
             if key in param_types:
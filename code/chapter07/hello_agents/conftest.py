@@ -0,0 +1,5 @@
+import os
+import sys
+
+# hello_agents 内部使用以本目录为根的绝对导入（from core.xxx import ...）
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
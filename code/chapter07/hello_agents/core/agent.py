@@ -3,6 +3,7 @@ from typing import Any, Optional
 from .message import Message
 from .config import Config
 from .llm import HelloAgentsLLM
+from .history import ConversationHistory, HistoryView, TokenCounter, Summarizer
 
 class Agent(ABC):
     """
@@ -15,12 +16,20 @@ class Agent(ABC):
         llm: Optional[HelloAgentsLLM] = None,
         system_prompt: Optional[str] = None,
         config: Optional[Config] = None,
+        token_counter: Optional[TokenCounter] = None,
+        history_summarizer: Optional[Summarizer] = None,
     ):
         self.name = name
         self.llm = llm if llm is not None else HelloAgentsLLM()
         self.system_prompt = system_prompt if system_prompt is not None else "You are a helpful assistant."
         self.config = config if config is not None else Config.from_env()
-        self._history: list[Message] = []
+        # 历史记录按 config 中的消息条数上限和令牌预算自动淘汰最旧的消息
+        self._history = ConversationHistory(
+            max_tokens=self.config.max_history_tokens,
+            max_messages=self.config.max_history_length,
+            token_counter=token_counter,
+            summarizer=history_summarizer,
+        )
 
     @abstractmethod
     def run(self, input_text: str) -> str:
@@ -44,9 +53,22 @@ class Agent(ABC):
 
     def get_history(self) -> list[Message]:
         """
-        获取当前的历史记录。
+        获取当前的历史记录（副本）。
         """
-        return self._history.copy()
+        return self._history.to_list()
+
+    def get_history_view(self) -> HistoryView:
+        """
+        获取当前历史记录的只读视图，不复制消息，适合在每轮对话中构建提示词。
+        """
+        return self._history.view()
+
+    @property
+    def history_tokens(self) -> int:
+        """
+        当前历史记录的估算令牌数。
+        """
+        return self._history.total_tokens
     
     def __str__(self) -> str:
         return f"Agent(name={self.name}, provider={self.llm.provider}, model={self.llm.model})"
\ No newline at end of file
@@ -0,0 +1,242 @@
+"""LLM响应缓存"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+def make_cache_key(
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: Optional[float],
+    max_tokens: Optional[int],
+    extra: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    根据请求内容计算缓存键（内容寻址），字节级相同的请求得到相同的键。
+
+    Args:
+        model (str): 模型ID。
+        messages (List[Dict[str, Any]]): 消息列表。
+        temperature (float): 采样温度。
+        max_tokens (int): 最大生成令牌数。
+        extra (Dict[str, Any]): 其他会影响输出的请求参数。
+    Returns:
+        str: sha256 十六进制摘要。
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "extra": extra or {},
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def replay_stream(content: str, chunk_size: int = 16) -> Iterator[str]:
+    """
+    将缓存的完整响应按固定长度切分，模拟流式输出。
+    """
+    for i in range(0, len(content), chunk_size):
+        yield content[i:i + chunk_size]
+
+
+@dataclass
+class CacheStats:
+    """
+    缓存统计信息。
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class BaseCache(ABC):
+    """
+    缓存基类：定义了响应缓存的核心接口，并负责命中/未命中计数。
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        """
+        Args:
+            ttl (float): 缓存条目的存活时间（秒），None 表示永不过期。
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存，未命中或已过期时返回 None。
+        """
+        value = self._get(key)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """
+        写入缓存。
+        """
+        self._set(key, value)
+
+    def stats(self) -> CacheStats:
+        """
+        获取缓存统计信息。
+        """
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses, evictions=self._evictions, size=len(self))
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, value: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class MemoryCache(BaseCache):
+    """
+    内存缓存：基于 OrderedDict 的 LRU 缓存，支持容量上限与 TTL 过期。
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            max_size (int): 最多缓存的条目数，超出时淘汰最久未使用的条目。
+            ttl (float): 缓存条目的存活时间（秒）。
+        """
+        super().__init__(ttl)
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if self._expired(created_at):
+                del self._data[key]
+                self._evictions += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(BaseCache):
+    """
+    磁盘缓存：基于 SQLite 持久化，进程重启后依然有效，支持容量上限（LRU）与 TTL 过期。
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Args:
+            path (str): 数据库文件路径，默认读取环境变量 LLM_CACHE_PATH。
+            max_size (int): 最多缓存的条目数，None 表示不限制。
+            ttl (float): 缓存条目的存活时间（秒）。
+        """
+        super().__init__(ttl)
+        self.path = path or os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite")
+        self.max_size = max_size
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)")
+            self._conn.commit()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self._expired(created_at):
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._evictions += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.max_size is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,),
+                )
+                self._evictions += max(cursor.rowcount, 0)
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,169 @@
+"""LLM客户端连接池"""
+
+import asyncio
+import os
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+ClientKey = Tuple[str, str, str, float]
+
+
+@dataclass
+class PoolStats:
+    """
+    连接池统计信息：记录客户端的命中、未命中次数以及当前缓存的客户端数量。
+    """
+    hits: int = 0
+    misses: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ClientPool:
+    """
+    进程级的OpenAI客户端池
+
+    按 (provider, base_url, api_key, timeout) 复用同一个客户端及其底层的 httpx 连接池，
+    避免每个智能体都重新建立 TLS 握手和连接。
+    1. 线程安全：多个线程可以共享同一个池和其中的客户端。
+    2. 可调节的长连接：支持设置保活连接数和保活过期时间。
+    3. 单主机连接上限：每个客户端只访问一个 base_url，因此 max_connections 即为单主机连接数上限。
+    4. 异步客户端：AsyncOpenAI 的连接绑定在事件循环上，因此异步客户端按事件循环分别缓存，
+       事件循环被回收后对应的客户端也随之释放。
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+    ):
+        """
+        初始化连接池。优先使用传入的参数，其次使用环境变量。
+        Args:
+            max_connections (int): 每个主机的最大并发连接数。
+            max_keepalive_connections (int): 每个主机保持的最大空闲长连接数。
+            keepalive_expiry (float): 空闲长连接的保活时间（秒）。
+        """
+        self.max_connections = max_connections or int(os.getenv("LLM_POOL_MAX_CONNECTIONS", 100))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv("LLM_POOL_MAX_KEEPALIVE", 20))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", 30.0))
+
+        self._lock = threading.Lock()
+        self._clients: Dict[ClientKey, OpenAI] = {}
+        # event loop -> {ClientKey: AsyncOpenAI}
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._hits = 0
+        self._misses = 0
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @staticmethod
+    def _make_key(provider: Optional[str], base_url: str, api_key: str, timeout: float) -> ClientKey:
+        return (provider or "auto", base_url, api_key, float(timeout))
+
+    def get_client(self, provider: Optional[str], base_url: str, api_key: str, timeout: float) -> OpenAI:
+        """
+        获取（或创建）与给定配置对应的OpenAI客户端。
+
+        Args:
+            provider (str): LLM服务提供商。
+            base_url (str): API基础URL。
+            api_key (str): API密钥。
+            timeout (float): 请求超时时间（秒）。
+        Returns:
+            OpenAI: 共享的客户端实例。
+        """
+        key = self._make_key(provider, base_url, api_key, timeout)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._hits += 1
+                return client
+
+            self._misses += 1
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout,
+                http_client=httpx.Client(limits=self._limits(), timeout=timeout),
+            )
+            self._clients[key] = client
+            return client
+
+    def get_async_client(self, provider: Optional[str], base_url: str, api_key: str, timeout: float) -> AsyncOpenAI:
+        """
+        获取（或创建）当前事件循环中与给定配置对应的AsyncOpenAI客户端。
+        必须在运行中的事件循环内调用。
+
+        Args:
+            provider (str): LLM服务提供商。
+            base_url (str): API基础URL。
+            api_key (str): API密钥。
+            timeout (float): 请求超时时间（秒）。
+        Returns:
+            AsyncOpenAI: 当前事件循环内共享的异步客户端实例。
+        """
+        loop = asyncio.get_running_loop()
+        key = self._make_key(provider, base_url, api_key, timeout)
+        with self._lock:
+            loop_clients = self._async_clients.setdefault(loop, {})
+            client = loop_clients.get(key)
+            if client is not None:
+                self._hits += 1
+                return client
+
+            self._misses += 1
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout,
+                http_client=httpx.AsyncClient(limits=self._limits(), timeout=timeout),
+            )
+            loop_clients[key] = client
+            return client
+
+    def stats(self) -> PoolStats:
+        """
+        获取连接池的统计信息。
+        """
+        with self._lock:
+            size = len(self._clients) + sum(len(c) for c in self._async_clients.values())
+            return PoolStats(hits=self._hits, misses=self._misses, size=size)
+
+    async def aclose(self) -> None:
+        """
+        关闭当前事件循环中的所有异步客户端。
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = list(self._async_clients.pop(loop, {}).values())
+        for client in clients:
+            await client.close()
+
+    def close(self) -> None:
+        """
+        关闭池中所有客户端并释放连接。
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+global_client_pool = ClientPool()
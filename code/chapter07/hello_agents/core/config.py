@@ -20,6 +20,7 @@ class Config(BaseModel):
 
     # 其他配置
     max_history_length: int = 100
+    max_history_tokens: Optional[int] = None
 
     @classmethod
     def from_env(cls) -> "Config":
@@ -33,7 +34,8 @@ class Config(BaseModel):
             max_tokens=int(os.getenv("MAX_TOKENS", cls.max_tokens)) if os.getenv("MAX_TOKENS") else None,
             debug=os.getenv("DEBUG", str(cls.debug)).lower() in ("true", "1", "yes"),
             log_level=os.getenv("LOG_LEVEL", cls.log_level),
-            max_history_length=int(os.getenv("MAX_HISTORY_LENGTH", cls.max_history_length))
+            max_history_length=int(os.getenv("MAX_HISTORY_LENGTH", cls.max_history_length)),
+            max_history_tokens=int(os.getenv("MAX_HISTORY_TOKENS")) if os.getenv("MAX_HISTORY_TOKENS") else None,
         )
     
     def to_dict(self) -> Dict[str, Any]:
@@ -0,0 +1,4 @@
+class HelloAgentsException(Exception):
+    """
+    hello_agents框架的基础异常。
+    """
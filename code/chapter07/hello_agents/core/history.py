@@ -0,0 +1,154 @@
+"""按令牌预算管理的对话历史"""
+
+from collections import deque
+from typing import Callable, Deque, Iterator, List, Optional, Sequence, overload
+
+from .message import Message
+
+TokenCounter = Callable[[str], int]
+Summarizer = Callable[[Optional[Message], List[Message]], Message]
+
+
+def char_token_counter(text: str) -> int:
+    """
+    基于字符的令牌数估算（无需分词器）：ASCII 约 4 个字符一个令牌，中日韩等多字节字符约 1 个字符一个令牌。
+    利用 UTF-8 编码长度与字符数之差估算多字节字符数，避免逐字符的 Python 循环。
+    """
+    n_chars = len(text)
+    n_wide = (len(text.encode("utf-8")) - n_chars) // 2
+    return (n_chars - n_wide) // 4 + n_wide + 1
+
+
+class HistoryView(Sequence[Message]):
+    """
+    对话历史的只读视图：直接引用底层存储，不复制消息列表。
+    如果存在摘要消息，它总是位于视图的第一条。
+    """
+
+    def __init__(self, history: "ConversationHistory"):
+        self._history = history
+
+    def __len__(self) -> int:
+        return len(self._history)
+
+    @overload
+    def __getitem__(self, index: int) -> Message: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Message]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        summary = self._history.summary
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("history index out of range")
+        if summary is not None:
+            if index == 0:
+                return summary
+            index -= 1
+        return self._history._messages[index]
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._history)
+
+
+class ConversationHistory:
+    """
+    对话历史存储：为每条消息记录令牌数并维护总令牌数。
+    超出令牌预算或消息条数上限时，从最旧的消息开始淘汰（每条消息最多被淘汰一次，均摊 O(1)）；
+    如果提供了摘要函数，被淘汰的消息会被合并进一条摘要消息，而不是直接丢弃。
+    摘要消息的令牌数同样计入预算；为避免历史写满后每次 append 都调用一次摘要函数，
+    有摘要函数时一次淘汰到预算的 evict_ratio 以下，之后若干次 append 都不再触发摘要。
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        token_counter: Optional[TokenCounter] = None,
+        summarizer: Optional[Summarizer] = None,
+        evict_ratio: float = 0.75,
+    ):
+        """
+        Args:
+            max_tokens (int): 令牌预算，None 表示不限制。
+            max_messages (int): 最多保留的消息条数（不含摘要），None 表示不限制。
+            token_counter (Callable[[str], int]): 令牌计数函数，默认使用 char_token_counter。
+            summarizer (Callable): 摘要函数，接收旧摘要和被淘汰的消息，返回新的摘要消息。
+            evict_ratio (float): 有摘要函数时，超出预算后淘汰到预算的这一比例以下。
+        """
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.token_counter = token_counter or char_token_counter
+        self.summarizer = summarizer
+        self.evict_ratio = evict_ratio
+        self.summary: Optional[Message] = None
+        self._messages: Deque[Message] = deque()
+        self._token_counts: Deque[int] = deque()
+        self._summary_tokens = 0
+        self._total_tokens = 0
+
+    @property
+    def total_tokens(self) -> int:
+        """
+        当前历史（含摘要）的总令牌数。
+        """
+        return self._total_tokens + self._summary_tokens
+
+    def append(self, message: Message) -> None:
+        """
+        追加一条消息，并在超出预算时淘汰最旧的消息。
+        """
+        tokens = self.token_counter(message.content)
+        self._messages.append(message)
+        self._token_counts.append(tokens)
+        self._total_tokens += tokens
+        self._enforce_budget()
+
+    def _over_budget(self, ratio: float = 1.0) -> bool:
+        if self.max_messages is not None and len(self._messages) > max(1, int(self.max_messages * ratio)):
+            return True
+        return self.max_tokens is not None and self.total_tokens > self.max_tokens * ratio
+
+    def _enforce_budget(self) -> None:
+        ratio = self.evict_ratio if self.summarizer is not None else 1.0
+        # 新摘要本身也占预算，摘要后仍然超出时继续淘汰；至少保留最新的一条消息
+        while len(self._messages) > 1 and self._over_budget():
+            evicted: List[Message] = []
+            while len(self._messages) > 1 and self._over_budget(ratio):
+                evicted.append(self._messages.popleft())
+                self._total_tokens -= self._token_counts.popleft()
+            if self.summarizer is not None:
+                self.summary = self.summarizer(self.summary, evicted)
+                self._summary_tokens = self.token_counter(self.summary.content)
+
+    def clear(self) -> None:
+        self._messages.clear()
+        self._token_counts.clear()
+        self._total_tokens = 0
+        self.summary = None
+        self._summary_tokens = 0
+
+    def view(self) -> HistoryView:
+        """
+        获取只读视图（零拷贝）。
+        """
+        return HistoryView(self)
+
+    def to_list(self) -> List[Message]:
+        """
+        复制为普通列表。
+        """
+        return list(self)
+
+    def __len__(self) -> int:
+        return len(self._messages) + (1 if self.summary is not None else 0)
+
+    def __iter__(self) -> Iterator[Message]:
+        if self.summary is not None:
+            yield self.summary
+        yield from self._messages
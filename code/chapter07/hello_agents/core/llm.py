@@ -1,9 +1,15 @@
 import os
+import asyncio
 
-from openai import OpenAI
-from typing import List, Dict, Any, Literal, Optional, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from openai import OpenAI, AsyncOpenAI
+from typing import List, Dict, Any, Literal, Optional, Iterator, AsyncIterator
 
-from core.exceptions import HelloAgentsException
+from core.exception import HelloAgentsException
+from core.client_pool import ClientPool, global_client_pool
+from core.cache import BaseCache, make_cache_key, replay_stream
+from core.rate_limiter import RateLimiter, estimate_tokens, get_provider_rate_limiter
 
 SUPPORTED_PROVIDERS = Literal[
         "openai",
@@ -19,12 +25,29 @@ SUPPORTED_PROVIDERS = Literal[
         "auto",
 ]
 
+@dataclass
+class BatchResult:
+    """
+    批量调用中单个请求的结果：成功时 content 有值，失败时 error 记录异常，不影响其他请求。
+    """
+    index: int
+    content: Optional[str] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
 class HelloAgentsLLM:
     """
     hello_agents的LLM客户端封装，支持与OpenAI兼容的API交互。
     1. 多提供商支持：实现对 OpenAI、ModelScope、智谱 AI 等多种主流 LLM 服务商的无缝切换，避免框架与特定供应商绑定。
     2. 本地模型集成：引入 VLLM 和 Ollama 这两种高性能本地部署方案，满足对数据隐私和低延迟的需求。
     3. 自动检测机制：通过智能检测用户环境，自动选择最合适的 LLM 方案，简化配置过程，提高用户体验。
+    4. 异步调用：提供 athink / ainvoke / astream_invoke，可在 asyncio 事件循环中并发驱动大量对话。
+    5. 响应缓存：可选的内容寻址缓存，字节级相同的请求直接返回缓存结果（流式调用会回放缓存内容）。
+    6. 批量调用：batch_invoke / abatch_invoke 以有限并发同时发送多个独立请求，并遵守提供商的速率限制。
     """
     def __init__(
         self, 
@@ -35,6 +58,9 @@ class HelloAgentsLLM:
         temprature: Optional[float] = 0.7,
         max_tokens: Optional[int] = None,
         timeout: Optional[int] = 60,
+        client_pool: Optional[ClientPool] = None,
+        cache: Optional[BaseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
         **kwargs            
     ):
         """
@@ -47,6 +73,9 @@ class HelloAgentsLLM:
             temprature (float): 采样温度。
             max_tokens (int): 最大生成令牌数。
             timeout (int): 请求超时时间（秒）。
+            client_pool (ClientPool): 客户端连接池，默认使用进程级共享的 global_client_pool。
+            cache (BaseCache): 响应缓存（MemoryCache / SQLiteCache），默认不启用。
+            rate_limiter (RateLimiter): 批量调用使用的速率限制器，默认使用提供商共享的限制器。
         """
         
         self.model = model or os.getenv("LLM_MODEL_ID")
@@ -54,6 +83,8 @@ class HelloAgentsLLM:
         self.max_tokens = max_tokens or (int(os.getenv("LLM_MAX_TOKENS")) if os.getenv("LLM_MAX_TOKENS") else None)
         self.kwargs = kwargs
         self.timeout = timeout or int(os.getenv("LLM_TIMEOUT", 60))
+        self.client_pool = client_pool or global_client_pool
+        self.cache = cache
 
         requested_provider = (provider or "").lower() if provider else None
         self.provider = provider or self._auto_detect_provider(api_key, base_url)
@@ -69,6 +100,7 @@ class HelloAgentsLLM:
             self.model = self._get_default_model()
         if not all([self.api_key, self.base_url]):
             raise HelloAgentsException("API key and base URL must be provided either as parameters or environment variables.")
+        self.rate_limiter = rate_limiter or get_provider_rate_limiter(self.provider)
     
         self._client = self._create_client()
 
@@ -228,16 +260,42 @@ class HelloAgentsLLM:
 
     def _create_client(self) -> OpenAI:
         """
-        创建OpenAI客户端实例。
+        从连接池获取OpenAI客户端实例，相同配置的LLM实例共享同一个客户端和底层连接。
         """
         print(f"使用提供商: {self.provider}, 模型: {self.model}")
         print(f"API基础URL: {self.base_url}")
-        return OpenAI(
+        return self.client_pool.get_client(
+            provider=self.provider,
+            base_url=self.base_url,
             api_key=self.api_key,
-            api_base=self.base_url,
             timeout=self.timeout,
         )
 
+    @property
+    def client(self) -> OpenAI:
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """
+        当前事件循环中的AsyncOpenAI客户端，与同步客户端共用提供商检测与凭据解析的结果。
+        """
+        return self.client_pool.get_async_client(
+            provider=self.provider,
+            base_url=self.base_url,
+            api_key=self.api_key,
+            timeout=self.timeout,
+        )
+
+    def _cache_key(self, messages: List[Dict[str, Any]], temperature: Optional[float], max_tokens: Optional[int]) -> Optional[str]:
+        """
+        计算请求的缓存键，未启用缓存时返回 None。
+        """
+        if self.cache is None:
+            return None
+        extra = {k: v for k, v in self.kwargs.items() if k not in ['temperature', 'max_tokens']}
+        return make_cache_key(self.model, messages, temperature, max_tokens, extra)
+
     def think(self, messages: List[Dict[str, Any]], temperature: Optional[float] = 0.7) -> Iterator[str]:
         """
         调用大语言模型进行推理，返回流式响应。
@@ -248,23 +306,39 @@ class HelloAgentsLLM:
         Returns:
             Iterator[str]: 流式响应生成器，每次迭代返回一部分内容
         """
+        temperature = temperature if temperature is not None else self.temperature
+        cache_key = self._cache_key(messages, temperature, self.max_tokens)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print ("命中响应缓存:")
+                for content in replay_stream(cached):
+                    print(content, end='', flush=True)
+                    yield content
+                print()
+                return
+
         print (f"正在调用模型 {self.model} 模型...")
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 max_tokens=self.max_tokens,
-                temperature=temperature if temperature is not None else self.temperature,
+                temperature=temperature,
                 stream=True, # Enable streaming responses
             )
             # Collect the streamed response
             print ("大模型响应成功:")
+            collected_content = []
             for chunk in response:
-                content = chunk.choices[0].delta.get("content", "")
+                content = chunk.choices[0].delta.content or ""
                 if content:
                     print(content, end='', flush=True)
+                    collected_content.append(content)
                     yield content
             print()  # For newline after completion
+            if cache_key is not None:
+                self.cache.set(cache_key, "".join(collected_content))
         except Exception as e:
             print(f"调用大语言模型API时出错: {e}")
             raise HelloAgentsException(f"LLM API调用失败: {e}")
@@ -273,22 +347,184 @@ class HelloAgentsLLM:
         """
         非流式调用大语言模型，返回完整响应。
         """
+        max_tokens = kwargs.get("max_tokens", self.max_tokens)
+        temperature = kwargs.get("temperature", self.temperature)
+        cache_key = self._cache_key(messages, temperature, max_tokens)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                max_tokens=kwargs.get("max_tokens", self.max_tokens),
-                temperature=kwargs.get("temperature", self.temperature),
+                max_tokens=max_tokens,
+                temperature=temperature,
                 **{k: v for k, v in self.kwargs.items() if k not in ['temperature', 'max_tokens']},
             )
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            if cache_key is not None and content is not None:
+                self.cache.set(cache_key, content)
+            return content
         except Exception as e:
             print(f"调用大语言模型API时出错: {e}")
             raise HelloAgentsException(f"LLM API调用失败: {e}")
         
+    def invoke_with_tools(self, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]], **kwargs) -> Any:
+        """
+        使用提供商原生的 function calling 调用大语言模型。
+        Args:
+            messages (List[Dict[str, Any]]): 消息列表。
+            tools (List[Dict[str, Any]]): OpenAI 格式的工具 schema 列表，通常来自 ToolRegistry.get_openai_tools()。
+        Returns:
+            ChatCompletionMessage: 模型返回的消息，可能包含多个 tool_calls。
+        """
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                tools=tools,
+                tool_choice=kwargs.get("tool_choice", "auto"),
+                max_tokens=kwargs.get("max_tokens", self.max_tokens),
+                temperature=kwargs.get("temperature", self.temperature),
+                **{k: v for k, v in self.kwargs.items() if k not in ['temperature', 'max_tokens', 'tool_choice']},
+            )
+            return response.choices[0].message
+        except Exception as e:
+            print(f"调用大语言模型API时出错: {e}")
+            raise HelloAgentsException(f"LLM API调用失败: {e}")
+
     def stream_invoke(self, messages: List[Dict[str, Any]], **kwargs) -> Iterator[str]:
         """
         流式调用大语言模型，与think方法相同。
         """
         temprature = kwargs.get("temperature", self.temperature)
-        return self.think(messages, temperature=temprature)
\ No newline at end of file
+        return self.think(messages, temperature=temprature)
+
+    async def athink(self, messages: List[Dict[str, Any]], temperature: Optional[float] = 0.7) -> AsyncIterator[str]:
+        """
+        think 的异步版本，返回异步流式响应。
+        Args:
+            messages (List[Dict[str, Any]]): 消息列表，符合OpenAI聊天模型的输入格式。
+            temperature (float): 采样温度。
+        Returns:
+            AsyncIterator[str]: 异步流式响应生成器，每次迭代返回一部分内容
+        """
+        temperature = temperature if temperature is not None else self.temperature
+        cache_key = self._cache_key(messages, temperature, self.max_tokens)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                for content in replay_stream(cached):
+                    yield content
+                return
+
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=temperature,
+                stream=True,
+            )
+            collected_content = []
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content or ""
+                if content:
+                    collected_content.append(content)
+                    yield content
+            if cache_key is not None:
+                self.cache.set(cache_key, "".join(collected_content))
+        except Exception as e:
+            print(f"调用大语言模型API时出错: {e}")
+            raise HelloAgentsException(f"LLM API调用失败: {e}")
+
+    async def ainvoke(self, messages: List[Dict[str, Any]], **kwargs) -> str:
+        """
+        invoke 的异步版本，非流式调用大语言模型，返回完整响应。
+        """
+        max_tokens = kwargs.get("max_tokens", self.max_tokens)
+        temperature = kwargs.get("temperature", self.temperature)
+        cache_key = self._cache_key(messages, temperature, max_tokens)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **{k: v for k, v in self.kwargs.items() if k not in ['temperature', 'max_tokens']},
+            )
+            content = response.choices[0].message.content
+            if cache_key is not None and content is not None:
+                self.cache.set(cache_key, content)
+            return content
+        except Exception as e:
+            print(f"调用大语言模型API时出错: {e}")
+            raise HelloAgentsException(f"LLM API调用失败: {e}")
+
+    def astream_invoke(self, messages: List[Dict[str, Any]], **kwargs) -> AsyncIterator[str]:
+        """
+        stream_invoke 的异步版本，与athink方法相同。
+        """
+        temprature = kwargs.get("temperature", self.temperature)
+        return self.athink(messages, temperature=temprature)
+
+    def batch_invoke(
+        self,
+        messages_list: List[List[Dict[str, Any]]],
+        max_concurrency: int = 8,
+        **kwargs,
+    ) -> List[BatchResult]:
+        """
+        批量非流式调用大语言模型，使用线程池以有限并发发送多个独立请求。
+        Args:
+            messages_list (List[List[Dict[str, Any]]]): 多组消息列表，每组对应一个独立请求。
+            max_concurrency (int): 最大并发请求数。
+        Returns:
+            List[BatchResult]: 与输入顺序一致的结果列表，单个请求失败只记录在对应结果中。
+        """
+        max_tokens = kwargs.get("max_tokens", self.max_tokens)
+
+        def _run(index: int, messages: List[Dict[str, Any]]) -> BatchResult:
+            try:
+                self.rate_limiter.acquire(estimate_tokens(messages, max_tokens))
+                return BatchResult(index=index, content=self.invoke(messages, **kwargs))
+            except Exception as e:
+                return BatchResult(index=index, error=e)
+
+        if not messages_list:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(messages_list)))) as executor:
+            return list(executor.map(_run, range(len(messages_list)), messages_list))
+
+    async def abatch_invoke(
+        self,
+        messages_list: List[List[Dict[str, Any]]],
+        max_concurrency: int = 8,
+        **kwargs,
+    ) -> List[BatchResult]:
+        """
+        batch_invoke 的异步版本，在当前事件循环中以有限并发发送多个独立请求。
+        """
+        max_tokens = kwargs.get("max_tokens", self.max_tokens)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _run(index: int, messages: List[Dict[str, Any]]) -> BatchResult:
+            async with semaphore:
+                try:
+                    wait = self.rate_limiter.reserve(estimate_tokens(messages, max_tokens))
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    return BatchResult(index=index, content=await self.ainvoke(messages, **kwargs))
+                except Exception as e:
+                    return BatchResult(index=index, error=e)
+
+        return list(await asyncio.gather(*(_run(i, m) for i, m in enumerate(messages_list))))
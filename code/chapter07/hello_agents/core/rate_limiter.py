@@ -0,0 +1,103 @@
+"""按提供商的请求/令牌速率限制"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> int:
+    """
+    粗略估计一次请求消耗的令牌数：按字符数估算输入，再加上最大输出令牌数。
+    """
+    chars = sum(len(str(m.get("content") or "")) for m in messages)
+    return chars // 2 + 4 * len(messages) + (max_tokens or 0)
+
+
+class _TokenBucket:
+    """
+    令牌桶：容量为每分钟配额，按 配额/60 的速率匀速回填。
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        预留 amount 个令牌，返回需要等待的秒数（允许透支，由调用方等待补足）。
+        """
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+
+class RateLimiter:
+    """
+    速率限制器：同时限制每分钟请求数（RPM）和每分钟令牌数（TPM），线程安全。
+    reserve 只负责计算等待时间，同步调用方使用 time.sleep，异步调用方使用 asyncio.sleep。
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        """
+        Args:
+            requests_per_minute (int): 每分钟最大请求数，None 表示不限制。
+            tokens_per_minute (int): 每分钟最大令牌数，None 表示不限制。
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        为一次请求预留配额。
+        Args:
+            tokens (int): 本次请求预计消耗的令牌数。
+        Returns:
+            float: 发送请求前需要等待的秒数。
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            return wait
+
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        阻塞直到配额可用。
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+
+_provider_limiters: Dict[str, RateLimiter] = {}
+_provider_limiters_lock = threading.Lock()
+
+
+def get_provider_rate_limiter(provider: Optional[str]) -> RateLimiter:
+    """
+    获取提供商共享的速率限制器，同一进程内同一提供商的所有LLM实例共用一份配额。
+    配额从环境变量读取，例如 DEEPSEEK_RPM / DEEPSEEK_TPM，其次是通用的 LLM_RPM / LLM_TPM。
+    """
+    provider = provider or "auto"
+    with _provider_limiters_lock:
+        limiter = _provider_limiters.get(provider)
+        if limiter is None:
+            prefix = provider.upper()
+            rpm = os.getenv(f"{prefix}_RPM") or os.getenv("LLM_RPM")
+            tpm = os.getenv(f"{prefix}_TPM") or os.getenv("LLM_TPM")
+            limiter = RateLimiter(
+                requests_per_minute=int(rpm) if rpm else None,
+                tokens_per_minute=int(tpm) if tpm else None,
+            )
+            _provider_limiters[provider] = limiter
+        return limiter
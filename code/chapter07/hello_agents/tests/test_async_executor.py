@@ -0,0 +1,28 @@
+import asyncio
+
+from tools.async_executor import AsyncToolExecutor, ToolCall
+from tools.registry import ToolRegistry
+
+
+def test_concurrency_limit_works_across_event_loops():
+    registry = ToolRegistry()
+    active = []
+    peak = []
+
+    async def slow_echo(text):
+        active.append(text)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.remove(text)
+        return text
+
+    registry.register_function("slow_echo", "回显输入", slow_echo)
+    executor = AsyncToolExecutor(registry, tool_concurrency={"slow_echo": 2})
+    calls = [ToolCall("slow_echo", str(i)) for i in range(5)]
+    try:
+        # 第二次 asyncio.run 使用新的事件循环，不能复用上一个循环里创建的 Semaphore
+        for _ in range(2):
+            assert asyncio.run(executor.execute_many(calls)) == [str(i) for i in range(5)]
+        assert max(peak) == 2
+    finally:
+        executor.close()
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from tools.async_executor import AsyncToolExecutor
+from tools.chain import ChainStep, ToolChain
+from tools.registry import ToolRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = ToolRegistry()
+    registry.register_function("upper", "转大写", lambda text: text.upper())
+    registry.register_function("echo", "回显输入", lambda text: text)
+
+    def boom(text):
+        raise RuntimeError("boom")
+
+    registry.register_function("boom", "总是失败", boom)
+    return registry
+
+
+def test_literal_braces_are_kept(registry):
+    chain = ToolChain("json", steps=[
+        ChainStep("upper", "upper"),
+        ChainStep("wrap", "echo", '{"query": "{upper}", "opts": {}}'),
+    ])
+
+    result = chain.run("abc", registry)
+
+    assert result.final_output == '{"query": "ABC", "opts": {}}'
+
+
+def test_failed_step_skips_dependents(registry):
+    chain = ToolChain("fail", steps=[
+        ChainStep("bad", "boom"),
+        ChainStep("after", "upper", "{bad}"),
+        ChainStep("after2", "echo", "{after}"),
+        ChainStep("side", "upper"),
+    ])
+    seen = []
+
+    async def _collect():
+        executor = AsyncToolExecutor(registry)
+        try:
+            async for stage in chain.astream("x", executor):
+                seen.append(stage)
+        finally:
+            executor.close()
+
+    asyncio.run(_collect())
+    stages = {stage.step: stage for stage in seen}
+
+    assert "boom" in stages["bad"].error
+    assert stages["after"].output is None and "bad" in stages["after"].error
+    assert stages["after2"].output is None and not stages["after2"].ok
+    assert stages["side"].ok and stages["side"].output == "X"
+
+
+def test_final_output_is_the_sink_step(registry):
+    chain = ToolChain("sink", steps=[
+        ChainStep("b", "echo", "{a}!"),
+        ChainStep("a", "upper"),
+    ])
+
+    result = chain.run("abc", registry)
+
+    assert result.ok
+    assert result.final_output == "ABC!"
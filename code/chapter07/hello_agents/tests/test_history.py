@@ -0,0 +1,43 @@
+import pytest
+
+from core.history import ConversationHistory
+from core.message import Message
+
+
+def _count_words(text):
+    return len(text.split())
+
+
+def test_view_rejects_out_of_range_index():
+    history = ConversationHistory()
+    for i in range(4):
+        history.append(Message(f"m{i}", "user"))
+    view = history.view()
+
+    assert view[-4].content == "m0"
+    with pytest.raises(IndexError):
+        view[-5]
+    with pytest.raises(IndexError):
+        view[4]
+
+
+def test_summarizer_is_batched_and_summary_counts_against_budget():
+    calls = []
+
+    def summarizer(summary, evicted):
+        calls.append(len(evicted))
+        return Message("summary " * 3, "system")
+
+    history = ConversationHistory(
+        max_tokens=20,
+        token_counter=_count_words,
+        summarizer=summarizer,
+    )
+    for i in range(40):
+        history.append(Message("a b", "user"))
+        assert history.total_tokens <= 20
+
+    # 每条消息 2 个令牌、摘要 3 个令牌：一次淘汰多条，而不是写满后每次 append 都摘要一次
+    assert 0 < len(calls) < 40 // 2
+    assert all(n > 1 for n in calls)
+    assert history.view()[0] is history.summary
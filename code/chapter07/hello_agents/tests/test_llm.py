@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from core.cache import MemoryCache
+from core.llm import HelloAgentsLLM
+
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class FakeCompletions:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        assert kwargs["stream"] is True
+        return iter([_chunk(p) for p in self.pieces] + [_chunk(None)])
+
+
+def _make_llm(pieces):
+    llm = HelloAgentsLLM(model="test-model", api_key="sk-test", base_url="http://localhost:9/v1",
+                         provider="custom", cache=MemoryCache())
+    completions = FakeCompletions(pieces)
+    llm._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return llm, completions
+
+
+def test_think_streams_sdk_chunks_and_fills_cache():
+    llm, completions = _make_llm(["你好", "，", "世界"])
+    messages = [{"role": "user", "content": "hi"}]
+
+    assert "".join(llm.think(messages)) == "你好，世界"
+    key = llm._cache_key(messages, 0.7, llm.max_tokens)
+    assert llm.cache.get(key) == "你好，世界"
+
+    # 第二次调用命中缓存，不再请求 API
+    assert "".join(llm.think(messages)) == "你好，世界"
+    assert completions.calls == 1
+
+
+def test_stream_invoke_uses_same_path():
+    llm, _ = _make_llm(["a", "b"])
+    assert "".join(llm.stream_invoke([{"role": "user", "content": "x"}])) == "ab"
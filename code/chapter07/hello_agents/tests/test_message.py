@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+
+from core.message import Message, MessageStore
+
+
+def test_store_round_trips_aware_timestamps_and_none_metadata():
+    aware = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone(timedelta(hours=8)))
+    naive = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    messages = [
+        Message("你好", "user", timestamp=aware, metadata=None),
+        Message("hi", "assistant", timestamp=naive),
+        Message("tool", "tool", timestamp=naive, metadata={"name": "search"}),
+    ]
+
+    store = MessageStore.from_messages(messages)
+
+    assert store[0].timestamp == aware
+    assert store[0].timestamp.utcoffset() == timedelta(hours=8)
+    assert store[0].metadata is None
+    assert store[1].timestamp.tzinfo is None
+    assert store[1].metadata == {}
+    assert [r.to_message().model_dump() for r in store] == [m.model_dump() for m in messages]
+
+
+def test_store_append_defaults_to_empty_metadata():
+    store = MessageStore()
+    ref = store.append("hi", "user")
+    assert ref.metadata == {}
+    assert store._metadata == {}
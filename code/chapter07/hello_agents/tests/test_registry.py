@@ -0,0 +1,28 @@
+from tools.base import Tool, ToolParameter
+from tools.registry import ToolRegistry
+
+
+class TagTool(Tool):
+    def __init__(self):
+        super().__init__("tag", "给文本打标签")
+
+    def run(self, parameters):
+        return ",".join(parameters["tags"])
+
+    def get_parameters(self):
+        return [ToolParameter(name="tags", description="标签列表", type="array")]
+
+
+def test_openai_tools_returns_copy_with_array_items():
+    registry = ToolRegistry()
+    registry.register_tool(TagTool())
+
+    tools = registry.get_openai_tools()
+    tags = tools[0]["function"]["parameters"]["properties"]["tags"]
+    assert tags["items"] == {"type": "string"}
+
+    tools[0]["function"]["name"] = "changed"
+    tools.append({})
+    fresh = registry.get_openai_tools()
+    assert len(fresh) == 1
+    assert fresh[0]["function"]["name"] == "tag"
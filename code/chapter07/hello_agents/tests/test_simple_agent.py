@@ -0,0 +1,91 @@
+import json
+
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+from agents.simple_agent import SimpleAgent
+from core.config import Config
+from tools.base import Tool, ToolParameter
+from tools.registry import ToolRegistry
+
+
+class AddTool(Tool):
+    def __init__(self):
+        super().__init__("add", "两数相加")
+
+    def run(self, parameters):
+        return parameters["a"] + parameters["b"]
+
+    def get_parameters(self):
+        return [
+            ToolParameter(name="a", description="加数", type="integer"),
+            ToolParameter(name="b", description="加数", type="integer"),
+        ]
+
+
+class FakeLLM:
+    """按顺序返回预设回复，并记录每次收到的消息。"""
+
+    provider = "fake"
+    model = "fake-model"
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def invoke(self, messages, **kwargs):
+        self.calls.append([dict(m) for m in messages])
+        return self.replies.pop(0)
+
+    def invoke_with_tools(self, messages, tools, **kwargs):
+        self.calls.append([dict(m) for m in messages])
+        return self.replies.pop(0)
+
+
+def _registry():
+    registry = ToolRegistry()
+    registry.register_tool(AddTool())
+    registry.register_function("shout", "转大写", lambda text: text.upper())
+    return registry
+
+
+def _agent(llm, mode):
+    return SimpleAgent("test", llm, config=Config(), tool_register=_registry(),
+                       enable_tools_calling=True, tool_calling_mode=mode)
+
+
+def test_text_mode_runs_key_value_and_function_tool_calls():
+    llm = FakeLLM(["[TOOL_CALL:add:a=1,b=2] [TOOL_CALL:shout:hello]", "结果是 3"])
+    agent = _agent(llm, "text")
+
+    assert agent.run("1+2?") == "结果是 3"
+    feedback = llm.calls[1][-1]["content"]
+    assert "工具'add'调用结果：\n3" in feedback
+    assert "工具'shout'调用结果：\nHELLO" in feedback
+    assert "错误" not in feedback
+
+
+def test_text_mode_maps_plain_text_to_first_parameter():
+    agent = _agent(FakeLLM([]), "text")
+
+    assert agent._parse_tool_parameters("add", "5") == {"a": 5}
+    assert agent._parse_tool_parameters("shout", "hi") == {"input": "hi"}
+
+
+def test_native_mode_executes_structured_tool_calls():
+    tool_calls = [
+        ChatCompletionMessageToolCall(id="call_1", type="function",
+                                      function=Function(name="add", arguments=json.dumps({"a": 1, "b": 2}))),
+        ChatCompletionMessageToolCall(id="call_2", type="function",
+                                      function=Function(name="shout", arguments=json.dumps({"input": "hi"}))),
+    ]
+    llm = FakeLLM([
+        ChatCompletionMessage(role="assistant", content=None, tool_calls=tool_calls),
+        ChatCompletionMessage(role="assistant", content="结果是 3"),
+    ])
+    agent = _agent(llm, "native")
+
+    assert agent.run("1+2?") == "结果是 3"
+    tool_messages = [m for m in llm.calls[1] if m["role"] == "tool"]
+    assert [(m["tool_call_id"], m["content"]) for m in tool_messages] == [("call_1", "3"), ("call_2", "HI")]
+    assert [m.content for m in agent.get_history()] == ["1+2?", "结果是 3"]
@@ -0,0 +1,156 @@
+"""异步工具执行器"""
+
+import asyncio
+import inspect
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from tools.registry import ToolRegistry
+
+
+@dataclass
+class ToolCall:
+    """
+    一次工具调用请求。
+
+    parameters 为字符串时按 registry.execute_tool 的约定处理（Tool 收到 {"input": ...}），
+    为字典时直接传给 Tool.run。
+    """
+    name: str
+    parameters: Union[str, Dict[str, Any]] = field(default_factory=dict)
+    id: Optional[str] = None
+
+
+class AsyncToolExecutor:
+    """
+    异步工具执行器
+
+    在 ToolRegistry 之上提供异步执行能力：
+    1. 同步工具在有界线程池中运行，异步工具（run 为协程函数）直接在事件循环中运行。
+    2. 每个工具可以设置并发上限，避免慢工具或有配额的工具被同时调用过多次。
+    3. 每次调用都有超时，超时后取消等待并返回错误信息。
+       注意：线程池中的同步工具无法被强制中断，超时后其线程会在后台运行结束。
+    4. execute_many 可并行执行同一轮 LLM 输出中的多个独立工具调用。
+    """
+
+    def __init__(
+        self,
+        registry: ToolRegistry,
+        max_workers: int = 8,
+        default_timeout: Optional[float] = 30.0,
+        tool_concurrency: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Args:
+            registry (ToolRegistry): 工具注册表。
+            max_workers (int): 运行同步工具的线程池大小。
+            default_timeout (float): 默认单次调用超时（秒），None 表示不限制。
+            tool_concurrency (Dict[str, int]): 工具名称到并发上限的映射。
+        """
+        self.registry = registry
+        self.default_timeout = default_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._limits: Dict[str, int] = dict(tool_concurrency or {})
+        # event loop -> {工具名: Semaphore}；Semaphore 绑定创建它的事件循环，多次 asyncio.run 时不能共用
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def set_concurrency(self, name: str, limit: int) -> None:
+        """
+        设置工具的并发上限。
+        """
+        self._limits[name] = limit
+        for loop_semaphores in self._semaphores.values():
+            loop_semaphores.pop(name, None)
+
+    def _semaphore(self, name: str) -> Optional[asyncio.Semaphore]:
+        limit = self._limits.get(name)
+        if not limit:
+            return None
+        loop_semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if name not in loop_semaphores:
+            loop_semaphores[name] = asyncio.Semaphore(limit)
+        return loop_semaphores[name]
+
+    async def _call(self, name: str, parameters: Union[str, Dict[str, Any]]) -> Any:
+        tool = self.registry.get_tool(name)
+        if tool is not None:
+            args = parameters if isinstance(parameters, dict) else {"input": parameters}
+            func, call_args = tool.run, (args,)
+        else:
+            func = self.registry.get_function(name)
+            call_args = (parameters if isinstance(parameters, str) else parameters.get("input", ""),)
+
+        if inspect.iscoroutinefunction(func):
+            return await func(*call_args)
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self._pool, func, *call_args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def execute(
+        self,
+        name: str,
+        parameters: Union[str, Dict[str, Any]],
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        异步执行单个工具调用。
+
+        Args:
+            name (str): 工具或函数名称。
+            parameters (str | dict): 输入文本或参数字典。
+            timeout (float): 本次调用的超时（秒），默认使用 default_timeout。
+        Returns:
+            str: 执行结果，出错或超时时返回错误信息。
+        """
+        if self.registry.get_tool(name) is None and self.registry.get_function(name) is None:
+            return f"工具或函数'{name}'未找到，无法执行。"
+
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return await self.invoke(name, parameters, timeout)
+        except asyncio.TimeoutError:
+            return f"工具'{name}'执行超时（{timeout}秒），已取消。"
+        except Exception as e:
+            return f"工具'{name}'执行失败，错误信息：{str(e)}"
+
+    async def invoke(
+        self,
+        name: str,
+        parameters: Union[str, Dict[str, Any]],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        与 execute 相同，但出错或超时时直接抛出异常，便于调用方区分失败与正常输出。
+
+        Raises:
+            KeyError: 工具或函数不存在。
+            asyncio.TimeoutError: 调用超时。
+        """
+        if self.registry.get_tool(name) is None and self.registry.get_function(name) is None:
+            raise KeyError(f"工具或函数'{name}'未找到，无法执行。")
+
+        timeout = self.default_timeout if timeout is None else timeout
+        semaphore = self._semaphore(name)
+        if semaphore is None:
+            return await asyncio.wait_for(self._call(name, parameters), timeout)
+        async with semaphore:
+            return await asyncio.wait_for(self._call(name, parameters), timeout)
+
+    async def execute_many(self, calls: List[ToolCall], timeout: Optional[float] = None) -> List[str]:
+        """
+        并行执行多个相互独立的工具调用，结果顺序与输入一致。
+        """
+        return list(await asyncio.gather(
+            *(self.execute(call.name, call.parameters, timeout) for call in calls)
+        ))
+
+    def close(self) -> None:
+        """
+        关闭线程池。
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
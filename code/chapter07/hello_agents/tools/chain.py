@@ -0,0 +1,246 @@
+"""工具链 / 流水线引擎"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Union
+
+from tools.registry import ToolRegistry
+from tools.async_executor import AsyncToolExecutor
+
+ParamTemplate = Union[str, Dict[str, Any]]
+
+# 占位符只匹配 {名称}（名称由字母、数字、下划线、连字符组成），JSON 等文本中的其他花括号原样保留
+_PLACEHOLDER = re.compile(r"\{([^\W\d][\w-]*)\}")
+
+
+def _template_refs(template: ParamTemplate) -> Set[str]:
+    """提取参数模板中引用的占位符名称，如 "{search}" -> {"search"}"""
+    values = template.values() if isinstance(template, dict) else [template]
+    refs = set()
+    for value in values:
+        if isinstance(value, str):
+            refs.update(_PLACEHOLDER.findall(value))
+    return refs
+
+
+def _render(value: Any, context: Dict[str, Any]) -> Any:
+    """用上下文渲染单个参数；整个值恰好是 "{name}" 时保留原始对象类型"""
+    if not isinstance(value, str):
+        return value
+    match = _PLACEHOLDER.fullmatch(value)
+    if match:
+        return context[match.group(1)]
+    return _PLACEHOLDER.sub(lambda m: str(context[m.group(1)]), value)
+
+
+@dataclass
+class ChainStep:
+    """
+    工具链中的一个步骤。
+
+    parameters 为参数模板：可以是字符串（作为工具的输入文本），也可以是参数字典。
+    模板中的 {input} 表示工具链的输入，{步骤名} 表示该步骤的输出；
+    引用到的步骤会自动成为当前步骤的依赖。
+    """
+    name: str
+    tool: str
+    parameters: ParamTemplate = "{input}"
+    depends_on: List[str] = field(default_factory=list)
+
+    def dependencies(self) -> Set[str]:
+        return (set(self.depends_on) | _template_refs(self.parameters)) - {"input"}
+
+
+@dataclass
+class StageResult:
+    """
+    单个步骤的执行结果与耗时。
+
+    error 非空表示该步骤失败（或因上游失败被跳过），此时 output 为 None。
+    """
+    step: str
+    tool: str
+    output: Any
+    started_at: float
+    elapsed: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class ChainResult:
+    """
+    整条工具链的执行结果。
+
+    outputs 只包含成功步骤的输出；final_output 为最后声明的汇点步骤（没有其他步骤依赖它）的输出。
+    """
+    outputs: Dict[str, Any]
+    stages: List[StageResult]
+    final_output: Any
+    elapsed: float
+
+    def timings(self) -> Dict[str, float]:
+        return {stage.step: stage.elapsed for stage in self.stages}
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        return {stage.step: stage.error for stage in self.stages if stage.error is not None}
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+class ToolChain:
+    """
+    声明式工具链
+
+    将多个工具按有向无环图（DAG）组织起来，直接把上游工具的输出填入下游工具的参数，
+    确定性的多工具流程无需每一步都经过一次LLM往返。
+    - 没有依赖关系的分支会并行执行
+    - astream 按完成顺序流式返回每个步骤的中间结果
+    - 某个步骤失败时，依赖它的步骤不会执行，而是标记为跳过
+    - 记录每个步骤的耗时
+    """
+
+    def __init__(self, name: str, description: str = "", steps: Optional[List[ChainStep]] = None):
+        self.name = name
+        self.description = description
+        self.steps: Dict[str, ChainStep] = {}
+        for step in steps or []:
+            self.add_step(step)
+
+    def add_step(self, step: ChainStep) -> "ToolChain":
+        """
+        添加步骤，返回自身以便链式调用。
+        """
+        if step.name == "input" or step.name in self.steps:
+            raise ValueError(f"步骤名称'{step.name}'不可用或已存在。")
+        self.steps[step.name] = step
+        return self
+
+    def validate(self) -> None:
+        """
+        校验依赖是否存在以及是否有环。
+        """
+        for step in self.steps.values():
+            missing = step.dependencies() - set(self.steps)
+            if missing:
+                raise ValueError(f"步骤'{step.name}'依赖了不存在的步骤：{sorted(missing)}")
+
+        visiting, done = set(), set()
+
+        def _visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"工具链'{self.name}'存在循环依赖：{name}")
+            visiting.add(name)
+            for dep in self.steps[name].dependencies():
+                _visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.steps:
+            _visit(name)
+
+    def sink(self) -> Optional[str]:
+        """
+        返回最后声明的汇点步骤（没有其他步骤依赖它），作为工具链的最终输出。
+        """
+        used = set()
+        for step in self.steps.values():
+            used |= step.dependencies()
+        sinks = [name for name in self.steps if name not in used]
+        return sinks[-1] if sinks else None
+
+    async def astream(self, input_text: str, executor: AsyncToolExecutor) -> AsyncIterator[StageResult]:
+        """
+        异步执行工具链，每完成一个步骤就产出其结果。
+
+        Args:
+            input_text (str): 工具链输入。
+            executor (AsyncToolExecutor): 用于执行工具的异步执行器。
+        """
+        self.validate()
+        context: Dict[str, Any] = {"input": input_text}
+        failed: Set[str] = set()
+        pending = {name: step.dependencies() for name, step in self.steps.items()}
+        running: Dict[asyncio.Task, str] = {}
+
+        async def _run(step: ChainStep) -> StageResult:
+            if isinstance(step.parameters, dict):
+                params = {k: _render(v, context) for k, v in step.parameters.items()}
+            else:
+                params = _render(step.parameters, context)
+            started_at = time.perf_counter()
+            try:
+                output = await executor.invoke(step.tool, params)
+            except asyncio.TimeoutError:
+                error = f"工具'{step.tool}'执行超时，已取消。"
+            except KeyError as e:
+                error = str(e.args[0]) if e.args else repr(e)
+            except Exception as e:
+                error = f"工具'{step.tool}'执行失败，错误信息：{str(e)}"
+            else:
+                return StageResult(step.name, step.tool, output, started_at, time.perf_counter() - started_at)
+            return StageResult(step.name, step.tool, None, started_at, time.perf_counter() - started_at, error)
+
+        try:
+            while pending or running:
+                ready = [name for name, deps in pending.items() if deps <= context.keys() | failed]
+                for name in ready:
+                    deps = pending.pop(name)
+                    upstream = sorted(deps & failed)
+                    if upstream:
+                        # 上游失败：不把错误信息当作正常输入传下去，直接跳过（其下游也会依次跳过）
+                        failed.add(name)
+                        yield StageResult(name, self.steps[name].tool, None, time.perf_counter(), 0.0,
+                                          f"上游步骤{upstream}失败，已跳过。")
+                        continue
+                    running[asyncio.ensure_future(_run(self.steps[name]))] = name
+
+                if not running:
+                    continue
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    del running[task]
+                    stage = task.result()
+                    if stage.ok:
+                        context[stage.step] = stage.output
+                    else:
+                        failed.add(stage.step)
+                    yield stage
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def arun(self, input_text: str, executor: AsyncToolExecutor) -> ChainResult:
+        """
+        异步执行整条工具链并汇总结果。
+        """
+        start = time.perf_counter()
+        stages = [stage async for stage in self.astream(input_text, executor)]
+        outputs = {stage.step: stage.output for stage in stages if stage.ok}
+        sink = self.sink()
+        return ChainResult(
+            outputs=outputs,
+            stages=stages,
+            final_output=outputs.get(sink) if sink is not None else None,
+            elapsed=time.perf_counter() - start,
+        )
+
+    def run(self, input_text: str, registry: ToolRegistry, max_workers: int = 8) -> ChainResult:
+        """
+        同步执行整条工具链（不能在运行中的事件循环内调用，此时请使用 arun）。
+        """
+        executor = AsyncToolExecutor(registry, max_workers=max_workers)
+        try:
+            return asyncio.run(self.arun(input_text, executor))
+        finally:
+            executor.close()
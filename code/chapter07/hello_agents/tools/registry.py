@@ -1,5 +1,6 @@
 """工具注册表"""
 
+import copy
 from typing import Optional, Any, Callable
 from tools.base import Tool
 
@@ -11,11 +12,27 @@ class ToolRegistry:
     支持两种工具注册方式：
     1. Tool对象注册（推荐）
     2. 函数直接注册（简便）
+
+    工具描述、参数类型映射和 OpenAI function calling schema 都会被缓存，
+    只有在注册、注销或清空工具时才会失效（version 递增）。
     """
 
     def __init__(self):
         self._tools: dict[str, Tool] = {}
         self._functions: dict[str, dict[str, Any]] = {}
+        self.version = 0
+        self._description_cache: Optional[str] = None
+        self._schemas_cache: Optional[list[dict[str, Any]]] = None
+        self._param_types_cache: dict[str, dict[str, str]] = {}
+
+    def _invalidate(self) -> None:
+        """
+        工具集合发生变化，清空所有缓存
+        """
+        self.version += 1
+        self._description_cache = None
+        self._schemas_cache = None
+        self._param_types_cache.clear()
 
     def register_tool(self, tool: Tool, auto_expand: bool = True) -> None:
         """
@@ -33,6 +50,7 @@ class ToolRegistry:
                     if sub_tool.name in self._tools:
                         print(f"警告：工具'{sub_tool.name}'已存在，将会覆盖。")
                     self._tools[sub_tool.name] = sub_tool
+                self._invalidate()
                 print(f"工具'{tool.name}'已展开为{len(expanded_tools)}个子工具并注册。")
                 return
             
@@ -40,6 +58,7 @@ class ToolRegistry:
             print(f"警告：工具'{tool.name}'已存在，将会覆盖。")
 
         self._tools[tool.name] = tool
+        self._invalidate()
         print(f"工具'{tool.name}'已注册。")
 
     def register_function(self, name: str, description: str, func: Callable[[str], str]) -> None:
@@ -58,6 +77,7 @@ class ToolRegistry:
             "description": description,
             "function": func
         }
+        self._invalidate()
         print(f"函数工具'{name}'已注册。")
 
     def unregister(self, name: str) -> None:
@@ -69,9 +89,11 @@ class ToolRegistry:
         """
         if name in self._tools:
             del self._tools[name]
+            self._invalidate()
             print(f"工具'{name}'已注销。")
         elif name in self._functions:
             del self._functions[name]
+            self._invalidate()
             print(f"函数工具'{name}'已注销。")
         else:
             print(f"警告：工具或函数'{name}'不存在，无法注销。")
@@ -85,6 +107,16 @@ class ToolRegistry:
         """
         return self._tools.get(name)
     
+    def get_function(self, name: str) -> Optional[Callable]:
+        """
+        获取注册的函数工具
+
+        参数：
+            name (str): 函数工具名称
+        """
+        info = self._functions.get(name)
+        return info["function"] if info else None
+
     def execute_tool(self, name: str, input_text: str) -> str:
         """
         执行注册的工具或函数
@@ -110,14 +142,73 @@ class ToolRegistry:
         
     def get_tools_description(self) -> str:
         """
-        获取所有注册工具和函数的描述信息
+        获取所有注册工具和函数的描述信息（缓存）
+        """
+        if self._description_cache is None:
+            descriptions = []
+            for tool in self._tools.values():
+                descriptions.append(f"工具名称: {tool.name}\n描述: {tool.description}\n")
+            for name, info in self._functions.items():
+                descriptions.append(f"函数工具名称: {name}\n描述: {info['description']}\n")
+            self._description_cache = "\n".join(descriptions) if descriptions else "暂无可用工具。"
+        return self._description_cache
+
+    def get_param_types(self, name: str) -> dict[str, str]:
+        """
+        获取工具的参数名到参数类型的映射（缓存）
+
+        参数：
+            name (str): 工具名称
         """
-        descriptions = []
-        for tool in self._tools.values():
-            descriptions.append(f"工具名称: {tool.name}\n描述: {tool.description}\n")
-        for name, info in self._functions.items():
-            descriptions.append(f"函数工具名称: {name}\n描述: {info['description']}\n")
-        return "\n".join(descriptions) if descriptions else "暂无可用工具。"
+        param_types = self._param_types_cache.get(name)
+        if param_types is None:
+            tool = self._tools.get(name)
+            if tool is None:
+                return {}
+            param_types = {param.name: param.type for param in tool.get_parameters()}
+            self._param_types_cache[name] = param_types
+        return param_types
+
+    def get_openai_tools(self) -> list[dict[str, Any]]:
+        """
+        导出所有工具和函数的 OpenAI function calling schema（缓存）
+
+        返回缓存的深拷贝，调用方修改结果不会影响缓存。
+        """
+        if self._schemas_cache is None:
+            schemas = []
+            for tool in self._tools.values():
+                properties, required = {}, []
+                for param in tool.get_parameters():
+                    properties[param.name] = {"type": param.type, "description": param.description}
+                    if param.type == "array":
+                        # JSON Schema 的 array 需要 items；ToolParameter 不记录元素类型，按字符串处理
+                        properties[param.name]["items"] = {"type": "string"}
+                    if param.required:
+                        required.append(param.name)
+                    elif param.default is not None:
+                        properties[param.name]["default"] = param.default
+                schemas.append(self._function_schema(tool.name, tool.description, properties, required))
+            for name, info in self._functions.items():
+                properties = {"input": {"type": "string", "description": "输入文本"}}
+                schemas.append(self._function_schema(name, info["description"], properties, ["input"]))
+            self._schemas_cache = schemas
+        return copy.deepcopy(self._schemas_cache)
+
+    @staticmethod
+    def _function_schema(name: str, description: str, properties: dict[str, Any], required: list[str]) -> dict[str, Any]:
+        return {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": description,
+                "parameters": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": required,
+                },
+            },
+        }
     
     def list_tools(self) -> list[str]:
         """
@@ -139,6 +230,7 @@ class ToolRegistry:
         """
         self._tools.clear()
         self._functions.clear()
+        self._invalidate()
         print("所有注册的工具和函数已清空。")
 
 